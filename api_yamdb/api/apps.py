@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .db import close_unusable_connections
+        if settings.DB_CONN_HEALTH_CHECKS:
+            request_started.connect(close_unusable_connections)
@@ -0,0 +1,145 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from reviews.models import User
+
+from .cache import LocalTTLCache, get_scope_versions, touch_scopes
+
+AUTH_STATE_KEY = 'auth-state:{}'
+# в общем кеше состояние лежит под версией области пользователя
+SHARED_AUTH_STATE_KEY = 'auth-state:{}:{:.6f}'
+AUTH_STATE_SCOPE = 'user:{}'
+AUTH_STATE_FIELDS = (
+    'id', 'username', 'role', 'is_superuser', 'is_active', 'role_version')
+# отсутствующий или заблокированный пользователь, тоже кешируется
+MISSING = {}
+
+
+class RoleAccessToken(AccessToken):
+    """Access-токен с версией прав пользователя в claims. Роль и флаги
+    в токен не попадают: они берутся из состояния прав, см.
+    get_auth_state, а role_version отзывает токены, выданные до смены
+    прав."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role_version'] = user.role_version
+        return token
+
+
+class RoleTokenUser(TokenUser):
+    """Пользователь запроса, собранный из закешированного состояния
+    прав без загрузки модели User."""
+
+    def __init__(self, token, state):
+        super().__init__(token)
+        self.state = state
+
+    @property
+    def id(self):
+        return self.state['id']
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def username(self):
+        return self.state['username']
+
+    @property
+    def role(self):
+        return self.state['role']
+
+    @property
+    def is_superuser(self):
+        return self.state['is_superuser']
+
+    @property
+    def is_user(self):
+        return self.role == 'user'
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_moderator(self):
+        return self.role == 'moderator'
+
+
+local_auth_states = LocalTTLCache(
+    settings.AUTH_STATE_LOCAL_MAXSIZE, settings.AUTH_STATE_LOCAL_TIMEOUT)
+
+
+def get_auth_state(user_id):
+    """Состояние прав пользователя или None для удалённых и заблокированных.
+
+    Сначала смотрим кеш процесса, затем общий кеш, и только потом БД.
+    В общем кеше ключ включает версию области пользователя, прочитанную
+    до запроса к БД. Если пользователя изменят между чтением из БД и
+    записью в кеш, старое состояние ляжет под прежней версией и больше
+    не найдётся - delete ключа такую запись бы не отменил.
+    """
+    key = AUTH_STATE_KEY.format(user_id)
+    state = local_auth_states.get(key)
+    if state is None:
+        version, = get_scope_versions([AUTH_STATE_SCOPE.format(user_id)])
+        shared_key = SHARED_AUTH_STATE_KEY.format(user_id, version)
+        state = cache.get(shared_key)
+        if state is None:
+            state = User.objects.filter(
+                pk=user_id, is_active=True
+            ).values(*AUTH_STATE_FIELDS).first() or MISSING
+            cache.set(shared_key, state, settings.AUTH_STATE_CACHE_TIMEOUT)
+        local_auth_states.set(key, state)
+    return state or None
+
+
+def forget_auth_state(user_id):
+    """Сбрасывает состояние прав в общем кеше и в кеше этого процесса.
+    Остальные воркеры увидят изменение не позже, чем через
+    AUTH_STATE_LOCAL_TIMEOUT секунд. Вызывается после фиксации
+    транзакции, иначе параллельный запрос успел бы прочитать из БД
+    ещё старое состояние."""
+    touch_scopes(AUTH_STATE_SCOPE.format(user_id))
+    local_auth_states.delete(AUTH_STATE_KEY.format(user_id))
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без загрузки модели User на каждый запрос.
+
+    Из токена берутся только id пользователя и role_version. Username,
+    роль и флаги пользователя запроса - из состояния прав get_auth_state:
+    кеш процесса, общий кеш, при промахе обоих - один запрос к БД.
+    Для токенов RoleAccessToken сверяется версия прав: смена роли,
+    флага суперпользователя или блокировка увеличивают
+    User.role_version и отзывают старые токены.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed(
+                'Токен не содержит идентификатор пользователя',
+                code='token_not_valid'
+            )
+        state = get_auth_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(
+                'Пользователь не найден или заблокирован',
+                code='user_not_found'
+            )
+        if ('role_version' in validated_token
+                and state['role_version'] != validated_token['role_version']):
+            raise AuthenticationFailed(
+                'Права пользователя изменились, получите новый токен',
+                code='role_changed'
+            )
+        return RoleTokenUser(validated_token, state)
@@ -0,0 +1,115 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+SCOPE_VERSION_KEY = 'scope-version:{}'
+RESPONSE_KEY = 'response:{path}:{auth}:{versions}'
+
+
+def get_scope_versions(scopes):
+    """Версии областей кеша - время последней записи в каждую область.
+
+    Область без версии (ещё не было записей или ключ вытеснен из кеша)
+    получает текущее время: все ранее закешированные для неё ответы
+    после этого становятся недостижимы.
+    """
+    keys = [SCOPE_VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time()
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, time.time()) for key in keys]
+
+
+def touch_scopes(*scopes):
+    """Отмечает запись в областях кеша, инвалидируя их ответы."""
+    now = time.time()
+    cache.set_many(
+        {SCOPE_VERSION_KEY.format(scope): now for scope in scopes}, None)
+
+
+def touch_scopes_on_commit(*scopes):
+    """touch_scopes после фиксации текущей транзакции, вне её - сразу.
+
+    Если сдвинуть версию до фиксации, параллельный запрос ещё прочитает
+    старые строки и закеширует их под новой версией - навсегда, у
+    ответов нет времени жизни. После фиксации такой ответ остаётся под
+    прежней версией и больше не находится.
+    """
+    transaction.on_commit(partial(touch_scopes, *scopes))
+
+
+def get_auth_state(request):
+    user = request.user
+    if not user.is_authenticated:
+        return 'anon'
+    return f'{user.role}:{int(user.is_superuser)}'
+
+
+def get_response_cache_key(request, scopes):
+    versions = ','.join(f'{version:.6f}'
+                        for version in get_scope_versions(scopes))
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return RESPONSE_KEY.format(
+        path=path, auth=get_auth_state(request), versions=versions)
+
+
+class LocalTTLCache:
+    """Ограниченный LRU-кеш в памяти процесса с временем жизни записей.
+
+    Живёт в одном воркере и не видит инвалидаций из других процессов,
+    поэтому время жизни записи - верхняя граница её устаревания.
+    """
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self._data.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        if self.maxsize < 1 or self.timeout <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
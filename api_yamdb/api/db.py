@@ -0,0 +1,31 @@
+from django.db import connections
+
+
+def close_unusable_connections(**kwargs):
+    """Закрывает сохранённые соединения, которые перестали отвечать.
+
+    Постоянное соединение (CONN_MAX_AGE > 0) может оборваться между
+    запросами: перезапуск PostgreSQL или pgbouncer, таймаут на сервере.
+    Проверка в начале запроса не даёт ему упасть на первом же SQL.
+    """
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+def violates_constraint(error, model, name):
+    """Вызвана ли IntegrityError нарушением ограничения name модели model.
+
+    PostgreSQL сообщает имя ограничения, SQLite - таблицу и столбцы
+    нарушенного уникального ограничения.
+    """
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None:
+        return diag.constraint_name == name
+    constraint = next(
+        item for item in model._meta.constraints if item.name == name)
+    columns = ', '.join(
+        f'{model._meta.db_table}.{model._meta.get_field(field).column}'
+        for field in constraint.fields
+    )
+    return str(error) == f'UNIQUE constraint failed: {columns}'
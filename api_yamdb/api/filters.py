@@ -1,4 +1,10 @@
 import django_filters
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, Value, When
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from reviews.models import Title
 
 
@@ -12,3 +18,99 @@ class TitleFilter(django_filters.FilterSet):
     class Meta:
         model = Title
         fields = ('category', 'genre', 'year', 'name')
+
+
+class TitleSearchFilter(filters.BaseFilterBackend):
+    """Поиск произведений по названию с сортировкой по релевантности.
+
+    Отбор идёт через icontains: в PostgreSQL его обслуживает
+    триграммный GIN-индекс по UPPER(name), релевантность считается
+    через pg_trgm. В SQLite релевантность грубее: точное совпадение,
+    затем совпадение по началу названия, затем все остальные.
+
+    Курсорная пагинация задаёт свой порядок и отбросила бы сортировку
+    по релевантности, поэтому вместе с ней поиск отклоняется.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if isinstance(getattr(view, 'paginator', None), CursorPagination):
+            raise ValidationError({self.search_param: [
+                'Поиск недоступен с курсорной пагинацией'
+            ]})
+        queryset = queryset.filter(name__icontains=query)
+        if connections[queryset.db].vendor == 'postgresql':
+            relevance = TrigramSimilarity('name', query)
+        else:
+            relevance = Case(
+                When(name__iexact=query, then=Value(1.0)),
+                When(name__istartswith=query, then=Value(0.5)),
+                default=Value(0.0),
+                output_field=FloatField()
+            )
+        return queryset.annotate(
+            search_rank=relevance).order_by('-search_rank', 'id')
+
+
+class StableOrderingFilter(filters.OrderingFilter):
+    """Сортировка ?ordering= по полям из ordering_fields вьюсета.
+
+    К выбранным полям добавляется id в том же направлении, чтобы страницы
+    не зависели от порядка строк с одинаковым значением, а запрос
+    совпадал с составным индексом (поле, id). Без параметра остаётся
+    сортировка по умолчанию из Meta.ordering модели.
+    """
+
+    def get_default_ordering(self, view):
+        return None
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return list(queryset.model._meta.ordering)
+        ordering = self.add_tiebreaker(queryset.model, ordering)
+        paginator = getattr(view, 'paginator', None)
+        if isinstance(paginator, CursorPagination):
+            self.check_cursor_ordering(queryset.model, ordering)
+        return ordering
+
+    def add_tiebreaker(self, model, ordering):
+        fields = [model._meta.get_field(name.lstrip('-'))
+                  for name in ordering]
+        if any(field.unique for field in fields):
+            return ordering
+        direction = '-' if ordering[0].startswith('-') else ''
+        return [*ordering, f'{direction}id']
+
+    def check_cursor_ordering(self, model, ordering):
+        # курсор хранит значение первого поля сортировки, NULL в нём
+        # не сравнить
+        field = model._meta.get_field(ordering[0].lstrip('-'))
+        if field.null:
+            raise ValidationError({self.ordering_param: [
+                f'Сортировка по {field.name} недоступна '
+                f'с курсорной пагинацией'
+            ]})
+
+    def filter_queryset(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param):
+            return queryset
+        return self.order_queryset(
+            queryset, self.get_ordering(request, queryset, view))
+
+    def order_queryset(self, queryset, ordering):
+        return queryset.order_by(*(
+            self.order_expression(queryset, name) for name in ordering))
+
+    def order_expression(self, queryset, name):
+        """В PostgreSQL NULL при убывании идёт первым, а произведения без
+        рейтинга должны быть в конце: для них есть индекс с NULLS LAST.
+        В SQLite NULL при убывании и так последний."""
+        field = queryset.model._meta.get_field(name.lstrip('-'))
+        if (name.startswith('-') and field.null
+                and connections[queryset.db].vendor == 'postgresql'):
+            return F(field.name).desc(nulls_last=True)
+        return name
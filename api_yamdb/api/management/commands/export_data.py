@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...export import CONTENT_TYPES, EXPORTS, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает таблицу в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(EXPORTS))
+        parser.add_argument(
+            '--format',
+            dest='output',
+            choices=sorted(CONTENT_TYPES),
+            default='ndjson',
+            help='Формат выгрузки'
+        )
+        parser.add_argument(
+            '--related',
+            action='store_true',
+            help='Добавить username авторов, slug категорий и жанров, '
+                 'сохранённые рейтинги и счётчики'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.EXPORT_CHUNK_SIZE,
+            help='Сколько строк читать из БД за раз'
+        )
+        parser.add_argument(
+            '--file',
+            help='Файл для выгрузки, по умолчанию stdout'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным')
+        chunks = stream_export(
+            options['name'],
+            options['output'],
+            options['related'],
+            options['chunk_size']
+        )
+        if not options['file']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['file'], 'w', newline='',
+                  encoding='utf-8') as file:
+            for chunk in chunks:
+                file.write(chunk)
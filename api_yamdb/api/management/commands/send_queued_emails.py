@@ -0,0 +1,139 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from ...models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди одним SMTP-соединением на пачку'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Сколько писем отправлять через одно соединение'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, опрашивая очередь'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Пауза между опросами пустой очереди, в секундах'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.release_abandoned()
+            processed = self.send_batch(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Обработано писем: {processed}')
+            purged = self.purge_sent()
+            if purged:
+                self.stdout.write(f'Удалено отправленных писем: {purged}')
+            if not options['loop']:
+                return
+            if not processed:
+                time.sleep(options['interval'])
+
+    def claim(self, batch_size):
+        """Забирает пачку писем короткой транзакцией.
+
+        Строки заблокированы только на время смены статуса, SMTP идёт
+        уже без транзакции и без блокировок.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            emails = list(
+                OutgoingEmail.objects.select_for_update(skip_locked=True)
+                .filter(status=OutgoingEmail.PENDING,
+                        next_attempt_at__lte=now)
+                .order_by('next_attempt_at')[:batch_size]
+            )
+            OutgoingEmail.objects.filter(
+                pk__in=[email.pk for email in emails]
+            ).update(status=OutgoingEmail.SENDING, claimed_at=now)
+        for email in emails:
+            email.status = OutgoingEmail.SENDING
+            email.claimed_at = now
+        return emails
+
+    def send_batch(self, batch_size):
+        emails = self.claim(batch_size)
+        if not emails:
+            return 0
+        try:
+            with get_connection() as connection:
+                for email in emails:
+                    self.send(email, connection)
+        except Exception as error:
+            # не удалось открыть или закрыть соединение
+            for email in emails:
+                if email.status == OutgoingEmail.SENDING:
+                    self.fail(email, error)
+                    self.save(email)
+        return len(emails)
+
+    def send(self, email, connection):
+        try:
+            email.to_message(connection).send()
+        except Exception as error:
+            self.fail(email, error)
+        else:
+            email.status = OutgoingEmail.SENT
+            email.sent_at = timezone.now()
+        # отмечаем сразу: если воркер упадёт, повторно уйдёт не больше
+        # одного письма, отправленного, но не отмеченного
+        self.save(email)
+
+    def save(self, email):
+        email.save(update_fields=(
+            'status', 'attempts', 'next_attempt_at', 'last_error',
+            'sent_at'))
+
+    def fail(self, email, error):
+        email.attempts += 1
+        email.last_error = repr(error)
+        if email.attempts >= settings.EMAIL_QUEUE_MAX_ATTEMPTS:
+            email.status = OutgoingEmail.FAILED
+            return
+        email.status = OutgoingEmail.PENDING
+        delay = settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (email.attempts - 1)
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+    def release_abandoned(self):
+        """Возвращает в очередь письма, которые взял и не отметил
+        упавший воркер, засчитывая это как неудачную попытку."""
+        cutoff = timezone.now() - timedelta(
+            seconds=settings.EMAIL_QUEUE_CLAIM_TIMEOUT)
+        with transaction.atomic():
+            emails = list(
+                OutgoingEmail.objects.select_for_update(skip_locked=True)
+                .filter(status=OutgoingEmail.SENDING, claimed_at__lt=cutoff)
+            )
+            for email in emails:
+                self.fail(email, TimeoutError('Воркер не отметил письмо'))
+                self.save(email)
+        return len(emails)
+
+    def purge_sent(self, limit=1000):
+        """Удаляет не больше limit отправленных писем старше
+        EMAIL_QUEUE_KEEP_SENT_DAYS, чтобы очередь не росла бесконечно."""
+        cutoff = timezone.now() - timedelta(
+            days=settings.EMAIL_QUEUE_KEEP_SENT_DAYS)
+        ids = list(OutgoingEmail.objects.filter(
+            status=OutgoingEmail.SENT, sent_at__lt=cutoff
+        ).values_list('pk', flat=True)[:limit])
+        if not ids:
+            return 0
+        return OutgoingEmail.objects.filter(pk__in=ids).delete()[0]
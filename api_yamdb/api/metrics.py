@@ -0,0 +1,260 @@
+"""Метрики приложения в текстовом формате Prometheus.
+
+Каждый процесс копит счётчики и гистограммы в памяти. Если задан
+METRICS_DIR, фоновый поток процесса раз в METRICS_FLUSH_INTERVAL секунд
+сохраняет изменившиеся значения в <METRICS_DIR>/<pid>.json, а /metrics
+суммирует файлы всех воркеров gunicorn - так результат не зависит от
+того, какой воркер обслужил запрос. Значения завершившихся воркеров
+переносятся в общий dead.json, чтобы суммы счётчиков не уменьшались.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Registry:
+
+    def __init__(self):
+        self.definitions = {}
+        self.values = {}
+        self.collectors = []
+        self.dirty = False
+        self.flusher_pid = None
+        self.lock = threading.Lock()
+
+    def counter(self, name, help_text, labels=()):
+        self.definitions[name] = ('counter', help_text, tuple(labels), None)
+        self.values.setdefault(name, {})
+        return name
+
+    def histogram(self, name, help_text, labels=(), buckets=DURATION_BUCKETS):
+        self.definitions[name] = (
+            'histogram', help_text, tuple(labels), tuple(buckets))
+        self.values.setdefault(name, {})
+        return name
+
+    def collector(self, function):
+        """Функция, которая при снятии метрик возвращает текущие значения
+        счётчиков, посчитанных в другом месте: {имя: {метки: значение}}."""
+        self.collectors.append(function)
+        return function
+
+    def label_key(self, name, labels):
+        return json.dumps([
+            str(labels[label]) for label in self.definitions[name][2]])
+
+    def inc(self, name, amount=1, **labels):
+        key = self.label_key(name, labels)
+        with self.lock:
+            samples = self.values[name]
+            samples[key] = samples.get(key, 0) + amount
+            self.changed()
+
+    def observe(self, name, value, **labels):
+        key = self.label_key(name, labels)
+        buckets = self.definitions[name][3]
+        with self.lock:
+            sample = self.values[name].setdefault(
+                key, [0] * len(buckets) + [0.0, 0])
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    sample[index] += 1
+            sample[-2] += value
+            sample[-1] += 1
+            self.changed()
+
+    def changed(self):
+        # после fork поток родителя не копируется, воркеру нужен свой
+        self.dirty = True
+        if settings.METRICS_DIR and self.flusher_pid != os.getpid():
+            self.flusher_pid = os.getpid()
+            threading.Thread(target=self.flush_periodically,
+                             daemon=True).start()
+            atexit.register(self.flush)
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            if self.dirty:
+                self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            values = {
+                name: {
+                    key: list(value) if isinstance(value, list) else value
+                    for key, value in samples.items()
+                }
+                for name, samples in self.values.items()
+            }
+        for collect in self.collectors:
+            for name, samples in collect().items():
+                values.setdefault(name, {}).update(
+                    (self.label_key(name, labels), value)
+                    for labels, value in samples
+                )
+        return values
+
+    def flush(self):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        self.dirty = False
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        # файл пишут и фоновый поток, и /metrics - у каждого свой черновик
+        draft = f'{path}.{threading.get_ident()}.tmp'
+        with open(draft, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(draft, path)
+
+    def collect(self):
+        """Значения всех процессов: файлы из METRICS_DIR или, если он
+        не задан, только текущего процесса."""
+        if not settings.METRICS_DIR:
+            return self.snapshot()
+        self.flush()
+        merged = {}
+        pattern = os.path.join(settings.METRICS_DIR, '*.json')
+        with directory_lock(settings.METRICS_DIR, fcntl.LOCK_SH):
+            for path in glob.glob(pattern):
+                merge(merged, read_values(path))
+        return {
+            name: samples for name, samples in merged.items()
+            if name in self.definitions
+        }
+
+    def render(self, gauges=()):
+        """Текстовый формат Prometheus. gauges - текущие значения,
+        которые считаются при снятии: (имя, описание, метки, значение)."""
+        values = self.collect()
+        lines = []
+        for name, (kind, help_text, labels, buckets) in sorted(
+                self.definitions.items()):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for key, value in sorted(values.get(name, {}).items()):
+                label_values = dict(zip(labels, json.loads(key)))
+                if kind == 'counter':
+                    lines.append(
+                        f'{name}{format_labels(label_values)} {value}')
+                    continue
+                for bound, count in zip(buckets, value):
+                    lines.append(f'{name}_bucket' + format_labels(
+                        {**label_values, 'le': bound}) + f' {count}')
+                lines.append(f'{name}_bucket' + format_labels(
+                    {**label_values, 'le': '+Inf'}) + f' {value[-1]}')
+                lines.append(
+                    f'{name}_sum{format_labels(label_values)} {value[-2]}')
+                lines.append(
+                    f'{name}_count{format_labels(label_values)} {value[-1]}')
+        for name, help_text, samples in gauges:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+            for labels, value in samples:
+                lines.append(f'{name}{format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def read_values(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def merge(merged, values):
+    """Прибавляет значения одного файла к merged."""
+    for name, samples in values.items():
+        target = merged.setdefault(name, {})
+        for key, value in samples.items():
+            if key not in target:
+                target[key] = value
+            elif isinstance(value, list):
+                target[key] = [a + b for a, b in zip(target[key], value)]
+            else:
+                target[key] += value
+    return merged
+
+
+@contextmanager
+def directory_lock(directory, operation):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, operation)
+        yield
+
+
+def mark_process_dead(directory, pid):
+    """Переносит значения завершившегося процесса pid в dead.json.
+
+    Счётчики и гистограммы накопительные: если просто удалить файл,
+    сумма по воркерам уменьшится, и Prometheus примет это за сброс.
+    Перенос под исключительной блокировкой, поэтому /metrics не увидит
+    значения дважды или ни разу. Новый воркер с тем же pid не затрёт
+    чужие значения, а число файлов не растёт с перезапусками воркеров.
+    """
+    path = os.path.join(directory, f'{pid}.json')
+    if not os.path.exists(path):
+        return
+    dead_path = os.path.join(directory, 'dead.json')
+    with directory_lock(directory, fcntl.LOCK_EX):
+        values = merge(read_values(dead_path), read_values(path))
+        draft = f'{dead_path}.tmp'
+        with open(draft, 'w') as file:
+            json.dump(values, file)
+        os.replace(draft, dead_path)
+        for leftover in glob.glob(f'{path}*'):
+            os.remove(leftover)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"')
+         .replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.histogram(
+    'yamdb_http_request_duration_seconds',
+    'Длительность обработки запроса',
+    labels=('view', 'action', 'status'),
+)
+REQUEST_QUERIES = registry.histogram(
+    'yamdb_http_request_db_queries',
+    'Число SQL-запросов на HTTP-запрос',
+    labels=('view', 'action'),
+    buckets=QUERY_BUCKETS,
+)
+CACHE_REQUESTS = registry.counter(
+    'yamdb_cache_requests_total',
+    'Обращения к кешам приложения',
+    labels=('cache', 'result'),
+)
+
+
+@registry.collector
+def auth_state_cache():
+    from .authentication import local_auth_states
+
+    stats = local_auth_states.stats()
+    return {CACHE_REQUESTS: [
+        ({'cache': 'auth_state', 'result': 'hit'}, stats['hits']),
+        ({'cache': 'auth_state', 'result': 'miss'}, stats['misses']),
+    ]}
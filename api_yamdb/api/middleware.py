@@ -0,0 +1,228 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import REQUEST_DURATION, REQUEST_QUERIES, registry
+
+logger = logging.getLogger('api.profiling')
+
+
+class FinishingStream:
+    """Содержимое потокового ответа, которое заканчивает замер при отдаче.
+
+    Конструктор StreamingHttpResponse ничего не читает из БД: запросы и
+    основное время приходятся на итерацию, которая идёт уже после выхода
+    из middleware. Обёртки SQL из stack остаются на соединениях, пока
+    поток не отдан до конца или не закрыт вместе с ответом (Django
+    вызывает close у содержимого), затем вызывается finish(finished).
+    """
+
+    def __init__(self, content, stack, finish):
+        self.content = content
+        self.stack = stack
+        self.finish = finish
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            yield from self.content
+        finally:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.stack.close()
+        self.finish(time.perf_counter())
+
+    @classmethod
+    def wrap(cls, response, stack, finish):
+        response.streaming_content = cls(
+            response.streaming_content, stack, finish)
+        return response
+
+
+class RequestProfile:
+    """Замеры одного запроса. Вызывается как execute_wrapper соединения
+    и накапливает число SQL, их суммарное время и повторы текстов."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = self.view_finished = self.rendered = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def mark_rendered(self, response):
+        self.rendered = time.perf_counter()
+
+    def timings(self, finished):
+        """Длительности в миллисекундах: БД, представление, вычисление
+        serializer.data (входит в представление), рендер ответа в JSON
+        и весь запрос."""
+        view_started = self.view_started or self.started
+        view_finished = self.view_finished or finished
+        return {
+            'db': (self.db_time, f'{self.queries} queries'),
+            'view': (view_finished - view_started, None),
+            'serialize': (self.serialize_time, None),
+            'render': ((self.rendered or view_finished) - view_finished, None),
+            'total': (finished - self.started, None),
+        }
+
+    def duplicates(self, limit=3):
+        return [
+            {'sql': sql, 'count': count}
+            for sql, count in self.statements.most_common(limit)
+            if count > 1
+        ]
+
+
+class RequestProfilingMiddleware:
+    """Профилирование выборки запросов: число SQL и время БД, время
+    представления, сериализации и рендера. Результат уходит в заголовок
+    Server-Timing и в лог api.profiling, медленные запросы логируются
+    с самыми частыми повторяющимися SQL - так видны N+1 в сериализаторах.
+    Заголовки потокового ответа уходят раньше, чем он сформирован,
+    поэтому Server-Timing ему не добавляется, а в лог запрос попадает
+    после отдачи потока.
+
+    Доля профилируемых запросов задаётся REQUEST_PROFILING_SAMPLE_RATE;
+    при нуле middleware сразу передаёт запрос дальше.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        self.slow_seconds = settings.REQUEST_PROFILING_SLOW_MS / 1000
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = request._profile = RequestProfile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+            if response.streaming:
+                return FinishingStream.wrap(
+                    response, stack.pop_all(),
+                    partial(self.finish_stream, request, response, profile))
+        finished = time.perf_counter()
+        timings = profile.timings(finished)
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            + (f';desc="{description}"' if description else '')
+            for name, (duration, description) in timings.items()
+        )
+        self.log(request, response, profile, timings)
+        return response
+
+    def finish_stream(self, request, response, profile, finished):
+        self.log(request, response, profile, profile.timings(finished))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view_finished = time.perf_counter()
+            response.add_post_render_callback(profile.mark_rendered)
+        return response
+
+    def log(self, request, response, profile, timings):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            **{
+                f'{name}_ms': round(duration * 1000, 1)
+                for name, (duration, _) in timings.items()
+            },
+        }
+        if timings['total'][0] >= self.slow_seconds:
+            record['duplicates'] = profile.duplicates()
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def get_view_labels(request):
+    """Вьюсет и действие обработавшего запрос представления.
+    Для APIView действие - HTTP-метод, для запросов мимо маршрутов
+    оба значения - unmatched."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched', 'unmatched'
+    view = getattr(match.func, 'cls', None)
+    method = request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    return (
+        view.__name__ if view is not None else match.view_name,
+        actions.get(method, method),
+    )
+
+
+class MetricsMiddleware:
+    """Гистограммы длительности и числа SQL для каждого запроса
+    с метками вьюсет/действие/статус, см. api.metrics. Потоковый
+    ответ замеряется до конца отдачи потока."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+            if response.streaming:
+                return FinishingStream.wrap(
+                    response, stack.pop_all(),
+                    partial(self.observe, request, response, counter,
+                            started))
+        self.observe(request, response, counter, started,
+                     time.perf_counter())
+        return response
+
+    def observe(self, request, response, counter, started, finished):
+        view, action = get_view_labels(request)
+        registry.observe(
+            REQUEST_DURATION, finished - started,
+            view=view, action=action, status=response.status_code)
+        registry.observe(
+            REQUEST_QUERIES, counter.queries, view=view, action=action)
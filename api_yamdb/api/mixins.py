@@ -0,0 +1,168 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import get_response_cache_key, get_scope_versions
+from .metrics import CACHE_REQUESTS, registry
+
+
+class CursorPaginationMixin:
+    """Включает курсорную пагинацию по запросу клиента.
+
+    По умолчанию вьюсет отдаёт постраничный список pagination_class,
+    а с параметром ?pagination=cursor (или с уже полученным cursor)
+    переключается на cursor_pagination_class.
+    """
+    cursor_pagination_class = None
+
+    def use_cursor_pagination(self):
+        if self.cursor_pagination_class is None or self.request is None:
+            return False
+        params = self.request.query_params
+        return (
+            params.get('pagination') == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param in params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            else:
+                return super().paginator
+        return self._paginator
+
+
+class CachedResponseMixin:
+    """Кеширует данные ответов на чтение до записи в связанные объекты.
+
+    Вьюсет перечисляет в get_cache_scopes области, от которых зависит
+    ответ, и оборачивает нужные действия в cached_response. Сигналы
+    из api.signals сдвигают версии областей при записи, поэтому
+    устаревшие ответы больше не находятся по ключу.
+    """
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = get_response_cache_key(request, self.get_cache_scopes())
+        data = cache.get(key)
+        registry.inc(
+            CACHE_REQUESTS, cache='response',
+            result='miss' if data is None else 'hit')
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalResponseMixin:
+    """Отвечает 304 на If-None-Match без запросов к БД.
+
+    ETag - хеш адреса запроса и версий областей из get_cache_scopes.
+    Last-Modified не отдаётся: с точностью до секунды запись в ту же
+    секунду, что и прошлый ответ, давала бы ложный 304 по
+    If-Modified-Since.
+    """
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        versions = get_scope_versions(self.get_cache_scopes())
+        validator = request.get_full_path() + ''.join(
+            f'{version:.6f}' for version in versions)
+        etag = quote_etag(hashlib.md5(validator.encode()).hexdigest())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+
+# класс сериализатора -> его подкласс с замером data
+TIMED_SERIALIZER_CLASSES = {}
+
+
+def timed_serializer_class(serializer_class):
+    """Подкласс serializer_class, который прибавляет время вычисления
+    data к serialize_time профиля запроса."""
+    if serializer_class not in TIMED_SERIALIZER_CLASSES:
+        def data(self):
+            started = time.perf_counter()
+            try:
+                return super(timed, self).data
+            finally:
+                self._profile.serialize_time += (
+                    time.perf_counter() - started)
+
+        timed = type(serializer_class.__name__, (serializer_class,), {
+            '__module__': serializer_class.__module__,
+            'data': property(data),
+        })
+        TIMED_SERIALIZER_CLASSES[serializer_class] = timed
+    return TIMED_SERIALIZER_CLASSES[serializer_class]
+
+
+class SerializeTimingMixin:
+    """Отдельный замер сериализации для RequestProfilingMiddleware.
+
+    Если запрос профилируется, сериализатор из get_serializer получает
+    класс с замером data (с many=True это ListSerializer), и время
+    превращения объектов в словари попадает в serialize.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        profile = getattr(self.request, '_profile', None)
+        if profile is not None:
+            serializer.__class__ = timed_serializer_class(type(serializer))
+            serializer._profile = profile
+        return serializer
+
+
+class NestedParentMixin:
+    """Родительский объект вложенного маршрута.
+
+    parent_lookups сопоставляет поля parent_model с параметрами адреса,
+    так вся цепочка (например, отзыв и его произведение) проверяется
+    одним запросом. Родитель загружается не больше одного раза за запрос,
+    а список без счётчика родителя проверяет его существование только
+    тогда, когда страница оказалась пустой.
+    """
+    parent_model = None
+    parent_lookups = {}
+
+    def get_parent_filter(self):
+        return {
+            field: self.kwargs[kwarg]
+            for field, kwarg in self.parent_lookups.items()
+        }
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(
+                self.parent_model, **self.get_parent_filter())
+        return self._parent
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page and not hasattr(self, '_parent') and not (
+                self.parent_model.objects.filter(
+                    **self.get_parent_filter()).exists()):
+            raise Http404
+        return page
@@ -0,0 +1,118 @@
+"""Пакетная модерация отзывов и комментариев.
+
+Записи обрабатываются пачками по id, каждая пачка - отдельная короткая
+транзакция из нескольких запросов над множествами строк. Объекты не
+загружаются и сигналы на каждую строку не отправляются, поэтому
+денормализованные счётчики (рейтинг произведения, число комментариев
+отзыва) пересчитываются по затронутым строкам после каждой пачки.
+"""
+from django.db import transaction
+from reviews.models import Comment, Review, Title
+
+from .cache import touch_scopes_on_commit
+
+
+def iter_id_batches(queryset, batch_size, ids=None):
+    """Первичные ключи queryset пачками по возрастанию.
+
+    Каждая пачка выбирается отдельным запросом от последнего id, так что
+    удалённые в предыдущей пачке строки не сдвигают следующую. Явный
+    список ids режется на части, чтобы не упереться в лимит параметров.
+    """
+    if ids is not None:
+        ids = sorted(set(ids))
+        for start in range(0, len(ids), batch_size):
+            batch = list(queryset.filter(
+                pk__in=ids[start:start + batch_size]
+            ).order_by('pk').values_list('pk', flat=True))
+            if batch:
+                yield batch
+        return
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_id).order_by(
+            'pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def raw_delete(queryset):
+    # QuerySet.delete() из-за сигналов грузит и удаляет строки по одной
+    return queryset._raw_delete(queryset.db)
+
+
+def moderate_reviews(ids, action, changes):
+    reviews = Review.objects.filter(pk__in=ids)
+    title_ids = set(reviews.values_list('title_id', flat=True).distinct())
+    affected = {'titles': title_ids}
+    if action == 'delete':
+        # каскад из Comment.review выполняем сами, до удаления отзывов
+        affected['comments_deleted'] = raw_delete(
+            Comment.objects.filter(review_id__in=ids))
+        count = raw_delete(reviews)
+    else:
+        count = reviews.update(**changes)
+    if action == 'delete' or 'score' in changes:
+        Title.objects.filter(pk__in=title_ids).rebuild_ratings()
+    scopes = ['titles']
+    for title_id in title_ids:
+        scopes += [f'title:{title_id}', f'reviews:{title_id}']
+    if action == 'delete':
+        scopes += [f'comments:{review_id}' for review_id in ids]
+    return count, affected, scopes
+
+
+def moderate_comments(ids, action, changes):
+    comments = Comment.objects.filter(pk__in=ids)
+    review_ids = set(
+        comments.values_list('review_id', flat=True).distinct())
+    if action == 'delete':
+        count = raw_delete(comments)
+        Review.objects.filter(pk__in=review_ids).rebuild_comment_counts()
+    else:
+        count = comments.update(**changes)
+    scopes = [f'comments:{review_id}' for review_id in review_ids]
+    return count, {'reviews': review_ids}, scopes
+
+
+# цель -> (модель, обработчик пачки, поля сводки о затронутых записях)
+HANDLERS = {
+    'reviews': (Review, moderate_reviews, ('titles', 'comments_deleted')),
+    'comments': (Comment, moderate_comments, ('reviews',)),
+}
+
+
+def moderate(target, action, filters, changes, batch_size, ids=None):
+    """Удаляет или правит отобранные filters записи target пачками.
+
+    Возвращает сводку: сколько записей затронуто, сколько было пачек и
+    сколько произведений (отзывов) получили пересчитанные счётчики.
+    """
+    model, handler, summary_fields = HANDLERS[target]
+    queryset = model.objects.filter(**filters)
+    count = batches = 0
+    affected = {}
+    for batch in iter_id_batches(queryset, batch_size, ids):
+        with transaction.atomic():
+            batch_count, batch_affected, scopes = handler(
+                batch, action, changes)
+            touch_scopes_on_commit(*scopes)
+        count += batch_count
+        batches += 1
+        for key, value in batch_affected.items():
+            if isinstance(value, set):
+                affected.setdefault(key, set()).update(value)
+            else:
+                affected[key] = affected.get(key, 0) + value
+    summary = {
+        'target': target,
+        'action': action,
+        'count': count,
+        'batches': batches,
+    }
+    for key in summary_fields:
+        value = affected.get(key, 0)
+        summary[key] = len(value) if isinstance(value, set) else value
+    return summary
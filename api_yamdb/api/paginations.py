@@ -1,10 +1,95 @@
+import hashlib
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
 from rest_framework import pagination
+from rest_framework.response import Response
 
 
 class CustomPagination(pagination.PageNumberPagination):
     pass
 
 
+class KnownCountPaginator(Paginator):
+    """Paginator, которому общее число объектов передаётся готовым."""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+
+class CachedCountPagination(CustomPagination):
+    """Постраничная пагинация без точного COUNT(*) на каждый запрос.
+
+    Число объектов берётся по порядку из:
+    - счётчика, который ведёт вьюсет (get_maintained_count);
+    - оценки планировщика PostgreSQL для нефильтрованных больших таблиц;
+    - кеша, куда попадает результат обычного COUNT(*).
+    Поле count_exact в ответе говорит, точное ли это число.
+    """
+    count_cache_timeout = settings.PAGINATION_COUNT_CACHE_TIMEOUT
+    estimate_threshold = settings.PAGINATION_ESTIMATE_THRESHOLD
+
+    def paginate_queryset(self, queryset, request, view=None):
+        count, self.count_exact = self.get_count(queryset, view)
+        self.django_paginator_class = partial(KnownCountPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count(self, queryset, view):
+        get_maintained_count = getattr(view, 'get_maintained_count', None)
+        if get_maintained_count is not None:
+            count = get_maintained_count()
+            if count is not None:
+                return count, True
+        if not queryset.query.where:
+            estimate = self.get_estimated_count(queryset)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return estimate, False
+        key = self.get_count_cache_key(queryset)
+        count = cache.get(key)
+        if count is not None:
+            return count, False
+        count = queryset.count()
+        cache.set(key, count, self.count_cache_timeout)
+        return count, True
+
+    def get_estimated_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+
+    def get_count_cache_key(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        return f'pagination-count:{queryset.db}:{digest}'
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_exact', self.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {'type': 'boolean'}
+        return response_schema
+
+
 class PaginatorPageSize2(CustomPagination):
     page_size = 2
 
@@ -15,3 +100,36 @@ class PaginatorPageSize3(CustomPagination):
 
 class PaginatorPageSize4(CustomPagination):
     page_size = 4
+
+
+class TitlePagination(CachedCountPagination):
+    page_size = 2
+
+
+class ReviewPagination(CachedCountPagination):
+    page_size = 3
+
+
+class CommentPagination(CachedCountPagination):
+    page_size = 4
+
+
+class CustomCursorPagination(pagination.CursorPagination):
+    """Keyset-пагинация: глубокие страницы не используют OFFSET и COUNT(*)."""
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = ('id',)
+
+
+class TitleCursorPagination(CustomCursorPagination):
+    page_size = 2
+
+
+class ReviewCursorPagination(CustomCursorPagination):
+    page_size = 3
+    ordering = ('-pub_date', '-id')
+
+
+class CommentCursorPagination(CustomCursorPagination):
+    page_size = 4
+    ordering = ('-pub_date', '-id')
@@ -11,6 +11,17 @@ class AdminOnlyPermission(permissions.BasePermission):
         )
 
 
+class ModeratorOrAdminPermission(permissions.BasePermission):
+    """Пакетная модерация отзывов и комментариев"""
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.is_moderator
+            or request.user.is_admin
+            or request.user.is_superuser
+        )
+
+
 class AdminOrReadOnlyPermission(permissions.BasePermission):
     """Админ может создавать и удалять произведения, категории и жанры.
      Может назначать роли пользователям. В остальном - только для чтения.
@@ -37,7 +48,7 @@ class AuthorModeratorAdminPermission(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
             request.method in permissions.SAFE_METHODS
-            or obj.author == request.user
+            or obj.author_id == request.user.id
             or request.user.is_moderator
             or request.user.is_admin
         )
@@ -49,4 +60,4 @@ class IsOwnerOrReadOnlyOrOfficial(permissions.BasePermission):
         return (
             request.method in permissions.SAFE_METHODS
             or request.user.role in ('admin', 'moderator')
-            or obj.author == request.user)
+            or obj.author_id == request.user.id)
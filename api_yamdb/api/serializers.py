@@ -1,5 +1,14 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
 from rest_framework import serializers
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from rest_framework.settings import api_settings
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+
+from .cache import touch_scopes_on_commit
+from .db import violates_constraint
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -117,6 +126,150 @@ class TitleWriteSerializer(serializers.ModelSerializer):
         model = Title
 
 
+class TitleBulkListSerializer(serializers.ListSerializer):
+    """Пакетное создание и изменение произведений.
+
+    Slug жанров и категорий, изменяемые произведения и занятые названия
+    загружаются одним запросом на модель для всего пакета. Если хотя бы
+    один элемент с ошибкой, ничего не записывается, а ошибки
+    возвращаются списком по позициям элементов.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) > settings.TITLES_BULK_MAX:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Ensure this list has no more than '
+                    f'{settings.TITLES_BULK_MAX} elements.'
+                ]
+            })
+        items = super().to_internal_value(data)
+        self.genres = dict(Genre.objects.filter(slug__in={
+            slug for item in items for slug in item.get('genre', ())
+        }).values_list('slug', 'id'))
+        self.categories = dict(Category.objects.filter(slug__in={
+            item['category'] for item in items if item.get('category')
+        }).values_list('slug', 'id'))
+        self.titles = Title.objects.in_bulk(
+            [item['id'] for item in items if 'id' in item])
+        names = [item['name'] for item in items if 'name' in item]
+        taken = dict(
+            Title.objects.filter(name__in=names).values_list('name', 'id'))
+        repeated = Counter(names)
+        repeated_ids = Counter(item['id'] for item in items if 'id' in item)
+        errors = []
+        for item in items:
+            item_errors = {}
+            if 'id' in item and item['id'] not in self.titles:
+                item_errors['id'] = ['Title does not exist.']
+            elif repeated_ids[item.get('id')] > 1:
+                item_errors['id'] = ['Title is repeated in the list.']
+            name = item.get('name')
+            if name is not None and (
+                    repeated[name] > 1
+                    or taken.get(name, item.get('id')) != item.get('id')):
+                item_errors['name'] = ['title with this name already exists.']
+            unknown = [slug for slug in item.get('genre', ())
+                       if slug not in self.genres]
+            if unknown:
+                item_errors['genre'] = [
+                    f'Object with slug={slug} does not exist.'
+                    for slug in unknown
+                ]
+            category = item.get('category')
+            if category and category not in self.categories:
+                item_errors['category'] = [
+                    f'Object with slug={category} does not exist.']
+            errors.append(item_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    # поле элемента пакета -> атрибут модели
+    title_fields = {
+        'name': 'name',
+        'year': 'year',
+        'description': 'description',
+        'category': 'category_id',
+    }
+
+    def create(self, validated_data):
+        titles = []
+        update_fields = set()
+        for item in validated_data:
+            title = self.titles.get(item.get('id')) or Title()
+            for field, attname in self.title_fields.items():
+                if field not in item:
+                    continue
+                value = item[field]
+                if field == 'category':
+                    value = self.categories.get(value)
+                setattr(title, attname, value)
+                if title.pk:
+                    update_fields.add(attname)
+            titles.append(title)
+        created = [title for title in titles if title.pk is None]
+        updated = [title for title in titles if title.pk is not None]
+        with transaction.atomic():
+            Title.objects.bulk_create(created)
+            if not connection.features.can_return_ids_from_bulk_insert:
+                # SQLite не возвращает id вставленных строк,
+                # названия уникальны - находим по ним
+                ids = dict(Title.objects.filter(
+                    name__in=[title.name for title in created]
+                ).values_list('name', 'id'))
+                for title in created:
+                    title.pk = ids[title.name]
+            if updated and update_fields:
+                Title.objects.bulk_update(updated, update_fields)
+            GenreTitle.objects.filter(title_id__in=[
+                title.pk for item, title in zip(validated_data, titles)
+                if 'genre' in item and item.get('id')
+            ]).delete()
+            GenreTitle.objects.bulk_create([
+                GenreTitle(title_id=title.pk, genre_id=self.genres[slug])
+                for item, title in zip(validated_data, titles)
+                for slug in dict.fromkeys(item.get('genre', ()))
+            ])
+        # bulk-операции не вызывают сигналы, кеш ответов сбрасываем сами
+        touch_scopes_on_commit(
+            'titles', *(f'title:{title.pk}' for title in titles))
+        return titles
+
+
+class TitleBulkSerializer(serializers.Serializer):
+    """Элемент пакета: без id - новое произведение, с id - изменение
+    переданных полей. Переданный genre заменяет жанры целиком. Новому
+    произведению, как и в TitleWriteSerializer, нужны все поля и
+    категория."""
+    id = serializers.IntegerField(required=False)
+    name = serializers.CharField(max_length=200, required=False)
+    year = serializers.IntegerField(required=False)
+    description = serializers.CharField(max_length=200, required=False)
+    genre = serializers.ListField(
+        child=serializers.SlugField(), required=False)
+    category = serializers.SlugField(required=False, allow_null=True)
+
+    class Meta:
+        list_serializer_class = TitleBulkListSerializer
+
+    # обязательные поля нового произведения
+    create_fields = ('name', 'year', 'description', 'genre', 'category')
+
+    def validate(self, attrs):
+        if 'id' not in attrs:
+            errors = {
+                field: [self.fields[field].error_messages['required']]
+                for field in self.create_fields if field not in attrs
+            }
+            if 'category' in attrs and attrs['category'] is None:
+                errors['category'] = [
+                    self.fields['category'].error_messages['null']]
+            if errors:
+                raise serializers.ValidationError(errors)
+        return attrs
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True, slug_field='username'
@@ -126,16 +279,19 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'score', 'pub_date')
         model = Review
 
-    def validate(self, data):
-        if self.context['view'].action == 'create':
-            current_user = self.context['request'].user
-            title_id = self.context['view'].kwargs['title_id']
-            reviewed = Review.objects.filter(
-                author=current_user, title__id=title_id).exists()
-            if reviewed:
-                raise serializers.ValidationError('an author allowed'
-                                                  'to review once')
-        return data
+    def create(self, validated_data):
+        # повторный отзыв отсекает ограничение 'title author unique',
+        # без предварительного запроса и без гонки между проверкой и вставкой
+        try:
+            return super().create(validated_data)
+        except IntegrityError as error:
+            if not violates_constraint(error, Review, 'title author unique'):
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'an author allowed' 'to review once'
+                ]
+            })
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -146,3 +302,83 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date')
         model = Comment
         read_only_fields = ('author',)
+
+
+class ModerationSerializer(serializers.Serializer):
+    """Отбор отзывов или комментариев и действие над ними.
+
+    Фильтры объединяются через И; без фильтров запрос отклоняется,
+    чтобы случайно не задеть всю таблицу.
+    """
+    FILTER_FIELDS = (
+        'ids', 'author', 'title', 'review', 'pub_date_after',
+        'pub_date_before')
+    CHANGE_FIELDS = {'reviews': ('text', 'score'), 'comments': ('text',)}
+
+    target = serializers.ChoiceField(choices=('reviews', 'comments'))
+    action = serializers.ChoiceField(choices=('delete', 'update'))
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False, allow_empty=False)
+    author = serializers.SlugRelatedField(
+        slug_field='username', queryset=User.objects.all(), required=False)
+    title = serializers.IntegerField(min_value=1, required=False)
+    review = serializers.IntegerField(min_value=1, required=False)
+    pub_date_after = serializers.DateTimeField(required=False)
+    pub_date_before = serializers.DateTimeField(required=False)
+    text = serializers.CharField(required=False)
+    score = serializers.IntegerField(
+        min_value=1, max_value=10, required=False)
+
+    def validate(self, data):
+        target = data['target']
+        if not any(field in data for field in self.FILTER_FIELDS):
+            raise serializers.ValidationError(
+                'At least one filter is required.')
+        if 'review' in data and target != 'comments':
+            raise serializers.ValidationError(
+                {'review': ['Only comments can be filtered by review.']})
+        allowed = self.CHANGE_FIELDS[target]
+        for field in ('text', 'score'):
+            if field in data and (
+                    data['action'] != 'update' or field not in allowed):
+                raise serializers.ValidationError(
+                    {field: [f'Not allowed for {data["action"]} '
+                             f'of {target}.']})
+        if data['action'] == 'update' and not any(
+                field in data for field in allowed):
+            raise serializers.ValidationError(
+                f'Nothing to update, expected one of: {", ".join(allowed)}.')
+        if data.get('pub_date_after') and data.get('pub_date_before') and (
+                data['pub_date_after'] > data['pub_date_before']):
+            raise serializers.ValidationError({
+                'pub_date_after': ['Must not be later than pub_date_before.']
+            })
+        return data
+
+    @property
+    def filters(self):
+        """Условия отбора для QuerySet.filter."""
+        data = self.validated_data
+        title_lookup = (
+            'title_id' if data['target'] == 'reviews'
+            else 'review__title_id')
+        lookups = {
+            'author': 'author',
+            'title': title_lookup,
+            'review': 'review_id',
+            'pub_date_after': 'pub_date__gte',
+            'pub_date_before': 'pub_date__lte',
+        }
+        return {
+            lookup: data[field] for field, lookup in lookups.items()
+            if field in data
+        }
+
+    @property
+    def changes(self):
+        return {
+            field: self.validated_data[field]
+            for field in self.CHANGE_FIELDS[self.validated_data['target']]
+            if field in self.validated_data
+        }
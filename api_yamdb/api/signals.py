@@ -0,0 +1,81 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User)
+
+from .authentication import forget_auth_state
+from .cache import touch_scopes_on_commit
+
+
+def touch_title(title_id):
+    touch_scopes_on_commit('titles', f'title:{title_id}')
+
+
+@receiver((post_save, post_delete), sender=Category)
+def invalidate_categories(sender, **kwargs):
+    touch_scopes_on_commit('categories')
+
+
+@receiver((post_save, post_delete), sender=Genre)
+def invalidate_genres(sender, **kwargs):
+    touch_scopes_on_commit('genres')
+
+
+@receiver((post_save, post_delete), sender=Title)
+def invalidate_title(sender, instance, **kwargs):
+    touch_title(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=GenreTitle)
+def invalidate_title_of(sender, instance, **kwargs):
+    touch_title(instance.title_id)
+
+
+@receiver((post_save, post_delete), sender=Review)
+def invalidate_reviews(sender, instance, **kwargs):
+    touch_scopes_on_commit(
+        'titles', f'title:{instance.title_id}',
+        f'reviews:{instance.title_id}')
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    touch_scopes_on_commit(f'comments:{instance.review_id}')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch_title(instance.pk)
+    elif pk_set:
+        touch_scopes_on_commit('titles', *(f'title:{pk}' for pk in pk_set))
+    else:
+        touch_scopes_on_commit('titles', 'genres')
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, created, raw, **kwargs):
+    """Отзывы и комментарии показывают username автора."""
+    loaded_username = getattr(instance, '_loaded_username', None)
+    if (created or raw or loaded_username is None
+            or loaded_username == instance.username):
+        return
+    title_ids = Review.objects.filter(author=instance).values_list(
+        'title_id', flat=True).distinct()
+    review_ids = Comment.objects.filter(author=instance).values_list(
+        'review_id', flat=True).distinct()
+    touch_scopes_on_commit(
+        *(f'reviews:{title_id}' for title_id in title_ids),
+        *(f'comments:{review_id}' for review_id in review_ids)
+    )
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_auth_state(sender, instance, **kwargs):
+    transaction.on_commit(partial(forget_auth_state, instance.pk))
@@ -1,6 +1,6 @@
-from api.views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                       ReviewViewSet, SignUpAPIView, TitleViewSet,
-                       TokenAPIView, UsersViewSet)
+from api.views import (CategoryViewSet, CommentViewSet, ExportAPIView,
+                       GenreViewSet, ModerationAPIView, ReviewViewSet,
+                       SignUpAPIView, TitleViewSet, TokenAPIView, UsersViewSet)
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -20,5 +20,7 @@ v1_router.register(
 urlpatterns = [
     path('v1/auth/token/', TokenAPIView.as_view(), name='token'),
     path('v1/auth/signup/', SignUpAPIView.as_view(), name='signup'),
+    path('v1/moderation/', ModerationAPIView.as_view(), name='moderation'),
+    path('v1/export/<str:name>/', ExportAPIView.as_view(), name='export'),
     path('v1/', include(v1_router.urls)),
 ]
@@ -1,30 +1,44 @@
+import hmac
 import random
+from functools import partial
 
-from django.core.mail import EmailMessage
-from django.db.models import Avg, IntegerField
-from django.db.models.functions import Cast
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as filters1
 from rest_framework import filters, mixins, permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import AccessToken
-from reviews.models import Category, Genre, Review, Title, User
+from reviews.models import Category, Comment, Genre, Review, Title, User
 
-from .filters import TitleFilter
-from .paginations import (PaginatorPageSize2, PaginatorPageSize3,
-                          PaginatorPageSize4)
+from .authentication import RoleAccessToken
+from .export import CONTENT_TYPES, EXPORTS, stream_export
+from .filters import StableOrderingFilter, TitleFilter, TitleSearchFilter
+from .metrics import registry
+from .mixins import (CachedResponseMixin, ConditionalResponseMixin,
+                     CursorPaginationMixin, NestedParentMixin,
+                     SerializeTimingMixin)
+from .models import OutgoingEmail
+from .moderation import moderate
+from .paginations import (CommentCursorPagination, CommentPagination,
+                          PaginatorPageSize2, PaginatorPageSize4,
+                          ReviewCursorPagination, ReviewPagination,
+                          TitleCursorPagination, TitlePagination)
 from .permissions import (AdminOnlyPermission, AdminOrReadOnlyPermission,
-                          IsOwnerOrReadOnlyOrOfficial)
+                          IsOwnerOrReadOnlyOrOfficial,
+                          ModeratorOrAdminPermission)
 from .serializers import (CategorySerializer, CommentSerializer,
                           ForNotAdminSerializer, GenreSerializer,
-                          ReviewSerializer, SignUpSerializer,
+                          ModerationSerializer, ReviewSerializer,
+                          SignUpSerializer, TitleBulkSerializer,
                           TitleReadSerializer, TitleWriteSerializer,
                           TokenSerializer, UserSerializer)
 
 
-class UsersViewSet(viewsets.ModelViewSet):
+class UsersViewSet(SerializeTimingMixin, viewsets.ModelViewSet):
     """Класс для обработки запросов GET и PATCH модели User"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -38,7 +52,10 @@ class UsersViewSet(viewsets.ModelViewSet):
         url_path='me'
     )
     def get_info_me(self, request):
-        user = get_object_or_404(User, username=self.request.user)
+        user = request.user
+        if not isinstance(user, User):
+            # пользователь восстановлен из токена, профиль грузим по id
+            user = get_object_or_404(User, pk=user.id)
         if request.method == 'GET':
             serializer = UserSerializer(user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -90,7 +107,7 @@ class TokenAPIView(APIView):
         confirmation_code = serializer.validated_data.get('confirmation_code')
         user = get_object_or_404(User, username=username)
         if confirmation_code == user.confirmation_code:
-            token = AccessToken.for_user(user)
+            token = RoleAccessToken.for_user(user)
             return Response({'token': str(token)},
                             status=status.HTTP_201_CREATED)
         return Response(
@@ -103,13 +120,13 @@ class SignUpAPIView(APIView):
     permission_classes = (permissions.AllowAny,)
 
     def send_email(self, data):
-        email_message = EmailMessage(
+        """Ставит письмо в очередь, отправит его send_queued_emails."""
+        OutgoingEmail.objects.create(
             subject=data.get('email_subject'),
             body=data.get('email_text'),
             from_email='admin@example.com',
-            to=[data.get('to E-mail')]
+            to=data.get('to E-mail')
         )
-        email_message.send()
 
     def post(self, request):
         serializer = SignUpSerializer(data=request.data)
@@ -137,7 +154,9 @@ class SignUpAPIView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class CategoryViewSet(mixins.CreateModelMixin,
+class CategoryViewSet(SerializeTimingMixin,
+                      CachedResponseMixin,
+                      mixins.CreateModelMixin,
                       mixins.DestroyModelMixin,
                       mixins.ListModelMixin,
                       viewsets.GenericViewSet):
@@ -149,8 +168,16 @@ class CategoryViewSet(mixins.CreateModelMixin,
     search_fields = ('name',)
     lookup_field = 'slug'
 
+    def get_cache_scopes(self):
+        return ('categories',)
 
-class GenreViewSet(mixins.CreateModelMixin,
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class GenreViewSet(SerializeTimingMixin,
+                   CachedResponseMixin,
+                   mixins.CreateModelMixin,
                    mixins.DestroyModelMixin,
                    mixins.ListModelMixin,
                    viewsets.GenericViewSet):
@@ -162,14 +189,29 @@ class GenreViewSet(mixins.CreateModelMixin,
     search_fields = ('name',)
     lookup_field = 'slug'
 
+    def get_cache_scopes(self):
+        return ('genres',)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all().annotate(rating=Cast(Avg('reviews__score'),
-                                            output_field=IntegerField()))
+
+class TitleViewSet(SerializeTimingMixin,
+                   CachedResponseMixin,
+                   ConditionalResponseMixin,
+                   CursorPaginationMixin,
+                   viewsets.ModelViewSet):
+    queryset = Title.objects.select_related(
+        'category').prefetch_related('genre')
     permission_classes = (AdminOrReadOnlyPermission,)
-    pagination_class = PaginatorPageSize2
-    filter_backends = (filters1.DjangoFilterBackend,)
+    pagination_class = TitlePagination
+    cursor_pagination_class = TitleCursorPagination
+    filter_backends = (
+        filters1.DjangoFilterBackend, TitleSearchFilter, StableOrderingFilter)
     filter_class = TitleFilter
+    # у каждого поля сортировки есть индекс, см. Title.Meta.indexes;
+    # rating - сохранённый рейтинг, а не подсчёт по отзывам
+    ordering_fields = ('rating', 'year', 'name')
 
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'partial_update':
@@ -177,36 +219,177 @@ class TitleViewSet(viewsets.ModelViewSet):
         else:
             return TitleReadSerializer
 
+    def get_cache_scopes(self):
+        if self.action == 'list':
+            return ('titles', 'categories', 'genres')
+        return (f'title:{self.kwargs["pk"]}', 'categories', 'genres')
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            partial(self.cached_response, super().retrieve),
+            request, *args, **kwargs)
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Создание и изменение списка произведений одним запросом."""
+        serializer = TitleBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        titles = serializer.save()
+        loaded = self.get_queryset().in_bulk([title.pk for title in titles])
+        return Response(
+            self.get_serializer(
+                [loaded[title.pk] for title in titles], many=True).data,
+            status=status.HTTP_200_OK
+        )
+
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(SerializeTimingMixin,
+                    ConditionalResponseMixin,
+                    CursorPaginationMixin,
+                    NestedParentMixin,
+                    viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly,
         IsOwnerOrReadOnlyOrOfficial)
-    pagination_class = PaginatorPageSize3
+    pagination_class = ReviewPagination
+    cursor_pagination_class = ReviewCursorPagination
+    filter_backends = (StableOrderingFilter,)
+    ordering_fields = ('pub_date', 'score')
+    parent_model = Title
+    parent_lookups = {'pk': 'title_id'}
 
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        title = get_object_or_404(Title, id=title_id)
-        return title.reviews.all()
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id')).select_related('author')
+
+    def get_maintained_count(self):
+        return self.get_parent().rating_count
+
+    def get_cache_scopes(self):
+        return (f'reviews:{self.kwargs["title_id"]}',)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(
+            author_id=self.request.user.id, title=self.get_parent())
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(SerializeTimingMixin,
+                     ConditionalResponseMixin,
+                     CursorPaginationMixin,
+                     NestedParentMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
-    pagination_class = PaginatorPageSize4
+    pagination_class = CommentPagination
+    cursor_pagination_class = CommentCursorPagination
+    filter_backends = (StableOrderingFilter,)
+    ordering_fields = ('pub_date',)
+    parent_model = Review
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
     permission_classes = (
         permissions.IsAuthenticatedOrReadOnly,
         IsOwnerOrReadOnlyOrOfficial)
 
     def get_queryset(self):
-        review_id = self.kwargs.get('review_id')
-        review = get_object_or_404(Review, id=review_id)
-        return review.comments.all()
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
+        ).select_related('author')
+
+    def get_maintained_count(self):
+        return self.get_parent().comment_count
+
+    def get_cache_scopes(self):
+        return (f'comments:{self.kwargs["review_id"]}',)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, pk=self.kwargs.get('review_id'))
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(
+            author_id=self.request.user.id, review=self.get_parent())
+
+
+class ModerationAPIView(APIView):
+    """Пакетное удаление и правка отзывов или комментариев модератором."""
+    permission_classes = (ModeratorOrAdminPermission,)
+
+    def post(self, request):
+        serializer = ModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        summary = moderate(
+            serializer.validated_data['target'],
+            serializer.validated_data['action'],
+            serializer.filters,
+            serializer.changes,
+            settings.MODERATION_BATCH_SIZE,
+            ids=serializer.validated_data.get('ids')
+        )
+        return Response(summary, status=status.HTTP_200_OK)
+
+
+class ExportAPIView(APIView):
+    """Потоковая выгрузка таблицы целиком, ?output=ndjson|csv.
+
+    Параметр называется не format: его DRF использует для выбора рендерера.
+    """
+    permission_classes = (AdminOnlyPermission,)
+
+    def get(self, request, name):
+        if name not in EXPORTS:
+            raise NotFound(f'Unknown export {name}.')
+        output = request.query_params.get('output', 'ndjson')
+        if output not in CONTENT_TYPES:
+            raise ValidationError({
+                'output': [f'Expected one of: {", ".join(CONTENT_TYPES)}.']
+            })
+        related = request.query_params.get('related', '').lower() in (
+            '1', 'true')
+        response = StreamingHttpResponse(
+            stream_export(
+                name, output, related, settings.EXPORT_CHUNK_SIZE),
+            content_type=CONTENT_TYPES[output]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{name}.{output}"')
+        return response
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus. Если задан METRICS_TOKEN,
+    запрос должен передать его в заголовке Authorization: Bearer."""
+    # байты, а не строки: compare_digest не сравнивает str не из ASCII
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(),
+            f'Bearer {settings.METRICS_TOKEN}'.encode()):
+        response = HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    queue = OutgoingEmail.objects.values('status').annotate(
+        emails=Count('id')).order_by()
+    gauges = [(
+        'yamdb_email_queue_depth',
+        'Письма в очереди по статусам',
+        [({'status': row['status']}, row['emails']) for row in queue],
+    )]
+    return HttpResponse(
+        registry.render(gauges),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
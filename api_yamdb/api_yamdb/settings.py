@@ -37,6 +37,8 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,6 +50,37 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'api_yamdb.urls'
 
+# Доля запросов, для которых считаются SQL и время (от 0 до 1),
+# и порог, после которого запрос логируется как медленный
+REQUEST_PROFILING_SAMPLE_RATE = float(
+    os.getenv('REQUEST_PROFILING_SAMPLE_RATE', 0))
+REQUEST_PROFILING_SLOW_MS = int(os.getenv('REQUEST_PROFILING_SLOW_MS', 500))
+
+# Каталог, через который воркеры gunicorn делятся метриками для /metrics.
+# Пустое значение - метрики только текущего процесса
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+# Токен, который сборщик метрик передаёт в Authorization: Bearer.
+# Пустое значение - /metrics без проверки, только для разработки
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_PROFILING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
@@ -83,10 +116,35 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        # Сколько секунд держать соединение открытым между запросами,
+        # 0 - закрывать после каждого запроса
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # В режиме пула (pgbouncer в режиме transaction) серверные
+        # курсоры не переживают транзакцию, поэтому их отключаем
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_POOL_MODE', '').lower() == 'pgbouncer'),
     }
 }
 
+# Проверять живость сохранённого соединения в начале каждого запроса
+DB_CONN_HEALTH_CHECKS = (
+    os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true')
+
+# По умолчанию кеш в памяти процесса. В продакшене с несколькими
+# воркерами нужен общий кеш, например:
+# CACHE_BACKEND=django.core.cache.backends.memcached.PyLibMCCache
+# CACHE_LOCATION=memcached:11211
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 3600))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -124,16 +182,47 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+# Очередь писем: число попыток и задержка перед первой повторной
+# попыткой в секундах, дальше задержка удваивается
+EMAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv('EMAIL_QUEUE_MAX_ATTEMPTS', 5))
+EMAIL_QUEUE_RETRY_DELAY = int(os.getenv('EMAIL_QUEUE_RETRY_DELAY', 30))
+# Через сколько секунд взятое, но не отмеченное письмо считается брошенным
+# упавшим воркером и возвращается в очередь как неудачная попытка
+EMAIL_QUEUE_CLAIM_TIMEOUT = int(os.getenv('EMAIL_QUEUE_CLAIM_TIMEOUT', 600))
+# Сколько дней хранить отправленные письма
+EMAIL_QUEUE_KEEP_SENT_DAYS = int(os.getenv('EMAIL_QUEUE_KEEP_SENT_DAYS', 7))
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
 }
 
+# Наибольшее число произведений в одном запросе titles/bulk/
+TITLES_BULK_MAX = int(os.getenv('TITLES_BULK_MAX', 1000))
+
+# Сколько отзывов или комментариев обрабатывает одна транзакция moderation/
+MODERATION_BATCH_SIZE = int(os.getenv('MODERATION_BATCH_SIZE', 1000))
+
+# Сколько строк за раз читает из БД потоковая выгрузка export/
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 100))
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 60))
+PAGINATION_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_ESTIMATE_THRESHOLD', 100000))
+
+# Состояние прав пользователя (роль, блокировка, версия прав) кешируется
+# в общем кеше и в памяти воркера. Запись в User сбрасывает общий кеш сразу,
+# кеш воркера устаревает не дольше AUTH_STATE_LOCAL_TIMEOUT секунд
+AUTH_STATE_CACHE_TIMEOUT = int(os.getenv('AUTH_STATE_CACHE_TIMEOUT', 300))
+AUTH_STATE_LOCAL_TIMEOUT = int(os.getenv('AUTH_STATE_LOCAL_TIMEOUT', 5))
+AUTH_STATE_LOCAL_MAXSIZE = int(os.getenv('AUTH_STATE_LOCAL_MAXSIZE', 1024))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
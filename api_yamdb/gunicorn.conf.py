@@ -0,0 +1,70 @@
+"""Настройки gunicorn. Каждый параметр можно переопределить переменной
+окружения GUNICORN_*, значения по умолчанию рассчитаны от числа CPU."""
+import multiprocessing
+import os
+import shutil
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Потоки дешевле процессов по памяти и помогают, пока запрос ждёт БД.
+# С потоками процессов нужно меньше: по одному на ядро плюс запасной
+threads = env_int('GUNICORN_THREADS', 1)
+workers = env_int(
+    'GUNICORN_WORKERS',
+    cpu_count + 1 if threads > 1 else 2 * cpu_count + 1
+)
+worker_class = os.getenv(
+    'GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+
+# Приложение импортируется в мастере до fork, и воркеры делят его память
+# copy-on-write. Соединения к БД при этом не открываются: Django создаёт
+# их лениво, а post_fork на всякий случай закрывает унаследованные
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+# Перезапуск воркера после max_requests запросов ограничивает рост памяти,
+# разброс jitter не даёт всем воркерам перезапуститься одновременно
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+# Сколько секунд держать простаивающее keep-alive соединение. Sync-воркеры
+# keep-alive не поддерживают, параметр действует для gthread и ASGI
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+# Воркеры складывают метрики в общий каталог, /metrics суммирует их
+metrics_dir = os.getenv('METRICS_DIR', '/tmp/yamdb-metrics')
+raw_env = [f'METRICS_DIR={metrics_dir}']
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG') or None
+errorlog = os.getenv('GUNICORN_ERRORLOG', '-')
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    # счётчики прошлого запуска не должны попасть в новые значения
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def child_exit(server, worker):
+    # значения завершившегося воркера переезжают в общий dead.json
+    from api.metrics import mark_process_dead
+
+    mark_process_dead(metrics_dir, worker.pid)
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    connections.close_all()
@@ -20,8 +20,10 @@ class UserAdmin(admin.ModelAdmin):
 class TitleAdmin(admin.ModelAdmin):
     list_display = (
         'name',
-        'category'
+        'category',
+        'rating'
     )
+    readonly_fields = ('rating_sum', 'rating_count', 'rating')
 
 
 class GenreAdmin(admin.ModelAdmin):
@@ -1,7 +1,13 @@
 import csv
 import os
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import DateTimeField, F
 
 from ...models import Category, Comment, Genre, GenreTitle, Review, Title, User
 
@@ -15,85 +21,197 @@ def get_csv_folder_path():
 
 csvs_folderpath = get_csv_folder_path()
 
-
-def csv_lines_list_to_dicts_list(csv_list):
-    res = []
-    columns = csv_list[0]
-    for index in range(1, len(csv_list)):
-        res.append(dict(zip(columns, csv_list[index])))
-    return res
-
-
-def get_dicts_list(filename):
-    csv_filepath = os.path.join(csvs_folderpath, filename)
-    with open(csv_filepath) as file:
-        csv_list = list(csv.reader(file))
-        return csv_lines_list_to_dicts_list(csv_list)
+# Порядок загрузки: файл, модель и ссылки вида
+# колонка csv -> (поле модели, модель, на которую ссылается колонка).
+# Колонки, которых нет у модели, пропускаются. Даты публикации (pub_date)
+# берутся из csv, а не проставляются временем загрузки.
+TABLES = (
+    ('users.csv', User, {}),
+    ('category.csv', Category, {}),
+    ('titles.csv', Title, {'category': ('category_id', Category)}),
+    ('genre.csv', Genre, {}),
+    ('genre_title.csv', GenreTitle, {
+        'title_id': ('title_id', Title),
+        'genre_id': ('genre_id', Genre),
+    }),
+    ('review.csv', Review, {
+        'title_id': ('title_id', Title),
+        'author': ('author_id', User),
+    }),
+    ('comments.csv', Comment, {
+        'review_id': ('review_id', Review),
+        'author': ('author_id', User),
+    }),
+)
+
+# Таблицы, которые очищаются в режиме truncate. Пользователей не трогаем:
+# среди них могут быть администраторы, созданные вручную.
+TRUNCATED_MODELS = (Comment, Review, GenreTitle, Title, Genre, Category)
+
+
+def get_default_date_fields(model):
+    """Даты со значением по умолчанию: пустая ячейка csv получает его,
+    как при обычном создании объекта."""
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if isinstance(field, DateTimeField) and field.has_default()
+    ]
+
+
+def read_batches(reader, batch_size):
+    while True:
+        batch = list(islice(reader, batch_size))
+        if not batch:
+            return
+        yield batch
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **options):
-        # users
-        dicts_list = get_dicts_list('users.csv')
-        [User.objects.get_or_create(**x)
-         for x in dicts_list]
-
-        # category
-        dicts_list = get_dicts_list('category.csv')
-        Category.objects.all().delete()
-        [Category.objects.get_or_create(**x)
-         for x in dicts_list]
-
-        # titles
-        dicts_list = get_dicts_list('titles.csv')
-
-        Title.objects.all().delete()
-
-        for each in dicts_list:
-            category = Category.objects.get(id=each['category'])
-            each['category'] = category
-            Title.objects.get_or_create(**each)
-
-        # genre
-        dicts_list = get_dicts_list('genre.csv')
-
-        Genre.objects.all().delete()
-
-        [Genre.objects.get_or_create(**x)
-         for x in dicts_list]
+    help = 'Потоково загружает данные из csv-файлов пачками bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            default=csvs_folderpath,
+            help='Каталог с csv-файлами'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько строк вставлять одной пачкой и одной транзакцией'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=('truncate', 'upsert'),
+            default='truncate',
+            help='truncate - очистить таблицы перед загрузкой, '
+                 'upsert - добавить новые строки и обновить существующие'
+        )
 
-        # genre_title
-        dicts_list = get_dicts_list('genre_title.csv')
-
-        GenreTitle.objects.all().delete()
-
-        for each in dicts_list:
-            title_id = each.pop('title_id')
-            genre_id = each.pop('genre_id')
-            each['title'] = Title.objects.get(id=title_id)
-            each['genre'] = Genre.objects.get(id=genre_id)
-            GenreTitle.objects.get_or_create(**each)
-
-        # review
-        dicts_list = get_dicts_list('review.csv')
-
-        Review.objects.all().delete()
-
-        for each in dicts_list:
-            title_id = each.pop('title_id')
-            each['title'] = Title.objects.get(id=title_id)
-            each['author'] = User.objects.get(id=each['author'])
-
-            Review.objects.get_or_create(**each)
-
-        # comments
-        dicts_list = get_dicts_list('comments.csv')
-
-        Comment.objects.all().delete()
-
-        for each in dicts_list:
-            review_id = each.pop('review_id')
-            each['review'] = Review.objects.get(id=review_id)
-            each['author'] = User.objects.get(id=each['author'])
-
-            Comment.objects.get_or_create(**each)
+    def handle(self, *args, **options):
+        data_dir = options['data_dir']
+        if not os.path.isdir(data_dir):
+            raise CommandError(f'Каталог {data_dir} не найден')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        if options['mode'] == 'truncate':
+            self.truncate()
+        self.known_ids = {}
+        for filename, model, references in TABLES:
+            self.load(
+                os.path.join(data_dir, filename),
+                model,
+                references,
+                options['batch_size'],
+                options['mode'] == 'upsert' or model not in TRUNCATED_MODELS
+            )
+        self.reset_sequences()
+        Title.objects.rebuild_ratings()
+        Review.objects.rebuild_comment_counts()
+        # закешированные ответы API после массовой загрузки устарели
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
+
+    def truncate(self):
+        tables = [
+            connection.ops.quote_name(model._meta.db_table)
+            for model in TRUNCATED_MODELS
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'TRUNCATE {", ".join(tables)}')
+            else:
+                for table in tables:
+                    cursor.execute(f'DELETE FROM {table}')
+
+    def get_known_ids(self, model):
+        if model not in self.known_ids:
+            self.known_ids[model] = set(
+                model.objects.values_list('id', flat=True).iterator())
+        return self.known_ids[model]
+
+    def load(self, filepath, model, references, batch_size, upsert):
+        label = model._meta.verbose_name_plural
+        fields = {
+            field.attname: field for field in model._meta.concrete_fields}
+        loaded_ids = self.get_known_ids(model)
+        started = time.monotonic()
+        total = skipped = 0
+        with open(filepath, newline='') as file:
+            reader = csv.DictReader(file)
+            columns = {
+                column: references.get(column, (column, None))
+                for column in reader.fieldnames
+                if column in references or column in fields
+            }
+            # при обновлении пишем только колонки из файла, кроме ключа
+            update_fields = [
+                attname for attname, _ in columns.values()
+                if not fields[attname].primary_key
+            ]
+            default_dates = get_default_date_fields(model)
+            for rows in read_batches(reader, batch_size):
+                objects = []
+                for row in rows:
+                    obj = self.build(model, row, columns, default_dates)
+                    if obj is None:
+                        skipped += 1
+                    else:
+                        objects.append(obj)
+                self.write_batch(
+                    model, objects, loaded_ids, upsert, update_fields)
+                loaded_ids.update(obj.id for obj in objects)
+                total += len(objects)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{label}: {total} строк, '
+                    f'{total / elapsed if elapsed else total:.0f} строк/с'
+                )
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'{label}: пропущено {skipped} строк с битыми ссылками'))
+
+    def build(self, model, row, columns, default_dates=()):
+        """Объект модели из строки csv или None, если ссылка битая.
+
+        Пустая дата из default_dates не передаётся в модель и получает
+        значение по умолчанию.
+        """
+        values = {}
+        for column, (attname, referenced) in columns.items():
+            value = row[column]
+            if referenced is not None:
+                if not value:
+                    value = None
+                elif int(value) not in self.get_known_ids(referenced):
+                    return None
+            if value or attname not in default_dates:
+                values[attname] = value
+        values['id'] = int(values['id'])
+        return model(**values)
+
+    def write_batch(self, model, objects, loaded_ids, upsert, update_fields):
+        with transaction.atomic():
+            if not upsert:
+                model.objects.bulk_create(objects)
+                return
+            model.objects.bulk_create(
+                [obj for obj in objects if obj.id not in loaded_ids])
+            existing = [obj for obj in objects if obj.id in loaded_ids]
+            if model is User and existing:
+                # bulk_update минует User.save, поэтому токены
+                # перезаписанных пользователей отзываем явно
+                for obj in existing:
+                    obj.role_version = F('role_version') + 1
+                update_fields = [*update_fields, 'role_version']
+            if existing and update_fields:
+                model.objects.bulk_update(existing, update_fields)
+
+    def reset_sequences(self):
+        models = [model for _, model, _ in TABLES]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
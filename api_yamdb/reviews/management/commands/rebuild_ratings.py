@@ -0,0 +1,56 @@
+from api.cache import touch_scopes
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import Review, Title
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает и проверяет сохранённые рейтинги произведений '
+            'и счётчики комментариев к отзывам')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить рейтинги, ничего не изменяя'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            self.check_mismatches(
+                Title.objects.rating_mismatches(),
+                'Рейтинг разошёлся с отзывами у {count} произведений'
+            )
+            self.check_mismatches(
+                Review.objects.comment_count_mismatches(),
+                'Число комментариев разошлось у {count} отзывов'
+            )
+            self.stdout.write(self.style.SUCCESS('Рейтинги согласованы'))
+            return
+        # update() не отправляет сигналов, поэтому кеш ответов
+        # исправленных строк сбрасывается здесь
+        title_ids = list(
+            Title.objects.rating_mismatches().values_list('id', flat=True))
+        review_ids = list(Review.objects.comment_count_mismatches(
+        ).values_list('id', flat=True))
+        updated = Title.objects.rebuild_ratings()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано произведений: {updated}'))
+        updated = Review.objects.rebuild_comment_counts()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано отзывов: {updated}'))
+        scopes = [f'comments:{review_id}' for review_id in review_ids]
+        for title_id in title_ids:
+            # по rating_count считается число отзывов в ленте произведения
+            scopes += [f'title:{title_id}', f'reviews:{title_id}']
+        if title_ids:
+            scopes.append('titles')
+        touch_scopes(*scopes)
+
+    def check_mismatches(self, mismatches, message):
+        broken = list(mismatches.values_list('id', flat=True)[:20])
+        if broken:
+            raise CommandError(
+                message.format(count=mismatches.count())
+                + f', например: {broken}'
+            )
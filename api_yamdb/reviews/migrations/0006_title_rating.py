@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:42
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_ratings(apps, schema_editor):
+    """Заполняет рейтинги двумя UPDATE над всей таблицей, как
+    TitleQuerySet.rebuild_ratings: сначала сумма и число оценок из
+    подзапросов, затем округлённое среднее из них."""
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')).order_by().values('title')
+    Title.objects.update(
+        rating_sum=Coalesce(
+            Subquery(reviews.annotate(s=Sum('score')).values('s')), 0),
+        rating_count=Coalesce(
+            Subquery(reviews.annotate(c=Count('id')).values('c')), 0),
+    )
+    Title.objects.filter(rating_count__gt=0).update(
+        rating=(2 * F('rating_sum') + F('rating_count'))
+        / (2 * F('rating_count')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_comment_review'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
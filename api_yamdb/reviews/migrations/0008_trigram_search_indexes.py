@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# (имя индекса, таблица, индексируемое выражение)
+TRIGRAM_INDEXES = (
+    ('reviews_title_name_trgm', 'reviews_title', 'name'),
+    ('reviews_title_name_upper_trgm', 'reviews_title', 'UPPER(name)'),
+    ('reviews_category_slug_trgm', 'reviews_category', 'slug'),
+    ('reviews_category_name_upper_trgm', 'reviews_category', 'UPPER(name)'),
+    ('reviews_genre_name_upper_trgm', 'reviews_genre', 'UPPER(name)'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, expression in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'USING gin (({expression}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_review_comment_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
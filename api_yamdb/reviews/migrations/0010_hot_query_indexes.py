@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:03
+
+from django.db import migrations, models
+from django.db.models import Min
+import django.db.models.deletion
+
+
+def remove_duplicate_links(apps, schema_editor):
+    """Оставляет по одной связи жанр-произведение перед созданием
+    уникального ограничения."""
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    first_links = GenreTitle.objects.order_by().values(
+        'genre', 'title').annotate(first_id=Min('id')).values('first_id')
+    GenreTitle.objects.exclude(id__in=first_links).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_user_role_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='genretitle',
+            name='genre',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='reviews.Genre'),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.IntegerField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['review', '-pub_date', '-id'], name='comment_review_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['title', '-pub_date', '-id'], name='review_title_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year'], name='title_category_year_idx'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_links, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='genretitle',
+            constraint=models.UniqueConstraint(fields=('genre', 'title'), name='genre title unique'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+# В PostgreSQL NULL больше любого значения, и обратный проход по
+# title_rating_id_idx отдал бы произведения без рейтинга первыми.
+# Для ?ordering=-rating нужен отдельный индекс с NULLS LAST.
+RATING_DESC_INDEX = 'title_rating_desc_idx'
+
+
+def create_rating_desc_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {RATING_DESC_INDEX} ON reviews_title '
+        f'(rating DESC NULLS LAST, id DESC)'
+    )
+
+
+def drop_rating_desc_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {RATING_DESC_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ('-pub_date', '-id')},
+        ),
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ('-pub_date', '-id')},
+        ),
+        migrations.AlterModelOptions(
+            name='title',
+            options={'ordering': ('id',)},
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.IntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['title', 'score', 'id'], name='review_title_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', 'id'], name='title_year_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['rating', 'id'], name='title_rating_id_idx'),
+        ),
+        migrations.RunPython(
+            create_rating_desc_index, drop_rating_desc_index),
+    ]
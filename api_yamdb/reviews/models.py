@@ -1,6 +1,10 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Case, Count, F, OuterRef, Q, Subquery, Sum,
+                              Value, When)
+from django.db.models.functions import Coalesce
 from django.template.defaultfilters import truncatechars
+from django.utils import timezone
 
 from .validators import validate_username
 
@@ -52,12 +56,44 @@ class User(AbstractUser):
         max_length=50,
         null=True
     )
+    role_version = models.PositiveIntegerField(
+        'Версия прав доступа',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-id',)
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_auth_state = instance.auth_state
+        instance._loaded_username = instance.__dict__.get('username')
+        return instance
+
+    @property
+    def auth_state(self):
+        return (
+            self.__dict__.get('role'),
+            self.__dict__.get('is_superuser'),
+            self.__dict__.get('is_active'),
+        )
+
+    def save(self, *args, **kwargs):
+        # смена роли или блокировка отзывает ранее выданные токены
+        loaded_auth_state = getattr(self, '_loaded_auth_state', None)
+        if loaded_auth_state and loaded_auth_state != self.auth_state:
+            self.role_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'role_version'}
+        super().save(*args, **kwargs)
+        self._loaded_auth_state = self.auth_state
+        self._loaded_username = self.username
+
     @property
     def is_user(self):
         return self.role == 'user'
@@ -92,6 +128,81 @@ class Genre(models.Model):
         return self.name
 
 
+def rating_expression(score_sum, review_count, empty_lookup):
+    """Округлённое среднее score_sum / review_count в виде SQL-выражения.
+
+    Считается в целых числах: (2 * sum + count) // (2 * count) даёт
+    округление половины вверх одинаково в PostgreSQL и SQLite.
+    empty_lookup - условие, при котором отзывов нет и рейтинг пуст.
+    """
+    return Case(
+        When(**empty_lookup, then=Value(None)),
+        default=(2 * score_sum + review_count) / (2 * review_count),
+        output_field=models.IntegerField()
+    )
+
+
+class TitleQuerySet(models.QuerySet):
+
+    def apply_review_score(self, score_delta, count_delta):
+        """Инкрементально обновляет сохранённый рейтинг одним UPDATE."""
+        score_sum = F('rating_sum') + score_delta
+        review_count = F('rating_count') + count_delta
+        return self.update(
+            rating_sum=score_sum,
+            rating_count=review_count,
+            rating=rating_expression(
+                score_sum,
+                review_count,
+                {'rating_count': -count_delta}
+            )
+        )
+
+    def _review_aggregates(self):
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')).order_by().values('title')
+        return {
+            'score_sum': Coalesce(
+                Subquery(reviews.annotate(s=Sum('score')).values('s')), 0),
+            'review_count': Coalesce(
+                Subquery(reviews.annotate(c=Count('id')).values('c')), 0),
+        }
+
+    def with_actual_rating(self):
+        """Аннотирует произведения агрегатами, посчитанными по отзывам."""
+        aggregates = self._review_aggregates()
+        return self.annotate(
+            actual_sum=aggregates['score_sum'],
+            actual_count=aggregates['review_count']
+        ).annotate(actual_rating=rating_expression(
+            F('actual_sum'), F('actual_count'), {'actual_count': 0}))
+
+    def rebuild_ratings(self):
+        """Пересчитывает сохранённые рейтинги по таблице отзывов."""
+        aggregates = self._review_aggregates()
+        with transaction.atomic():
+            self.update(
+                rating_sum=aggregates['score_sum'],
+                rating_count=aggregates['review_count']
+            )
+            return self.update(rating=rating_expression(
+                F('rating_sum'), F('rating_count'), {'rating_count': 0}))
+
+    def rating_mismatches(self):
+        """Произведения, у которых сохранённый рейтинг разошёлся с отзывами.
+
+        Сверяются и сумма с количеством, и сам столбец rating: он может
+        испортиться независимо от них.
+        """
+        return self.with_actual_rating().filter(
+            ~Q(rating_sum=F('actual_sum'))
+            | ~Q(rating_count=F('actual_count'))
+            | Q(actual_count=0, rating__isnull=False)
+            | Q(actual_count__gt=0, rating__isnull=True)
+            | Q(actual_count__gt=0) & ~Q(rating=F('actual_rating'))
+        )
+
+
 class Title(models.Model):
 
     category = models.ForeignKey(
@@ -105,19 +216,69 @@ class Title(models.Model):
     name = models.CharField(max_length=200, unique=True)
     year = models.IntegerField()
     description = models.CharField(max_length=200)
+    rating_sum = models.PositiveIntegerField('Сумма оценок', default=0)
+    rating_count = models.PositiveIntegerField('Количество отзывов', default=0)
+    rating = models.PositiveSmallIntegerField(
+        'Рейтинг',
+        blank=True,
+        null=True
+    )
+
+    objects = TitleQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            # фильтр ?year= и сортировка ?ordering=year
+            models.Index(fields=['year', 'id'], name='title_year_id_idx'),
+            # фильтр по категории вместе с годом
+            models.Index(
+                fields=['category', 'year'], name='title_category_year_idx'),
+            # сортировка по сохранённому рейтингу, ?ordering=rating
+            models.Index(fields=['rating', 'id'], name='title_rating_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class GenreTitle(models.Model):
-    genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
+    # отдельный индекс по жанру не нужен: его заменяет уникальный
+    # индекс (genre, title), который к тому же покрывает фильтр по жанру
+    genre = models.ForeignKey(
+        Genre, on_delete=models.CASCADE, db_index=False)
     title = models.ForeignKey(Title, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['genre', 'title'], name='genre title unique'),
+        ]
+
     def __str__(self):
         return f'{self.genre} + {self.title}'
 
 
+class ReviewQuerySet(models.QuerySet):
+
+    def with_actual_comment_count(self):
+        comments = Comment.objects.filter(
+            review=OuterRef('pk')).order_by().values('review')
+        return self.annotate(actual_comment_count=Coalesce(
+            Subquery(comments.annotate(c=Count('id')).values('c')), 0))
+
+    def rebuild_comment_counts(self):
+        """Пересчитывает сохранённое число комментариев к отзывам."""
+        comments = Comment.objects.filter(
+            review=OuterRef('pk')).order_by().values('review')
+        return self.update(comment_count=Coalesce(
+            Subquery(comments.annotate(c=Count('id')).values('c')), 0))
+
+    def comment_count_mismatches(self):
+        return self.with_actual_comment_count().exclude(
+            comment_count=F('actual_comment_count'))
+
+
 class Review(models.Model):
     text = models.TextField()
     title = models.ForeignKey(
@@ -125,11 +286,32 @@ class Review(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='reviews')
     score = models.IntegerField()
-    pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    # default, а не auto_now_add: auto_now_add перезаписывает и явно
+    # переданную дату, а импорт из csv сохраняет даты файла
+    pub_date = models.DateTimeField(
+        'Дата публикации', default=timezone.now, editable=False)
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0
+    )
+
+    objects = ReviewQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:50]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # рейтинг произведения обновляется в post_save в той же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_score = self.score
+
     @property
     def text_preview(self):
         return truncatechars(self.text, 30)
@@ -141,6 +323,17 @@ class Review(models.Model):
                     'title',
                     'author'],
                 name='title author unique')]
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            # лента отзывов произведения: новые первыми
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx'),
+            # отзывы произведения по оценке, ?ordering=score
+            models.Index(
+                fields=['title', 'score', 'id'],
+                name='review_title_score_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -149,7 +342,19 @@ class Comment(models.Model):
         User, on_delete=models.CASCADE, related_name='comments')
     review = models.ForeignKey(
         Review, on_delete=models.CASCADE, related_name='comments')
-    pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    # default, а не auto_now_add: auto_now_add перезаписывает и явно
+    # переданную дату, а импорт из csv сохраняет даты файла
+    pub_date = models.DateTimeField(
+        'Дата публикации', default=timezone.now, editable=False)
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            # лента комментариев к отзыву: новые первыми
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx'),
+        ]
 
     @property
     def text_preview(self):
@@ -0,0 +1,39 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Comment, Review, Title
+
+
+@receiver(post_save, sender=Review)
+def update_title_rating_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        score_delta, count_delta = instance.score, 1
+    else:
+        loaded_score = getattr(instance, '_loaded_score', None)
+        if loaded_score is None or loaded_score == instance.score:
+            return
+        score_delta, count_delta = instance.score - loaded_score, 0
+    Title.objects.filter(pk=instance.title_id).apply_review_score(
+        score_delta, count_delta)
+
+
+@receiver(post_delete, sender=Review)
+def update_title_rating_on_delete(sender, instance, **kwargs):
+    Title.objects.filter(pk=instance.title_id).apply_review_score(
+        -instance.score, -1)
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count_on_save(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        Review.objects.filter(pk=instance.review_id).update(
+            comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_count_on_delete(sender, instance, **kwargs):
+    Review.objects.filter(pk=instance.review_id).update(
+        comment_count=F('comment_count') - 1)
@@ -0,0 +1,185 @@
+"""Сценарии чтения и записи для v1 API: задержки и запросы к БД.
+
+Запускается из корня репозитория после benchmarks.seed:
+
+    python -m benchmarks.api --requests 2000 --write-ratio 0.1 \\
+        --output bench.json --baseline benchmarks/baseline.json
+
+Запросы выполняются в процессе через тестовый клиент DRF, база - та же,
+что у приложения (SQLite или PostgreSQL по переменным DB_*). Для каждого
+эндпоинта считаются p50/p95/p99, запросы в секунду и среднее число SQL
+на запрос. С --baseline результат сравнивается с сохранённым: рост
+числа запросов к БД (а с --tolerance и рост p95) завершает скрипт с
+кодом 1. Число запросов при одинаковых --seed не зависит от машины,
+поэтому в CI сравнивается только оно.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from .common import setup_django, summarize
+
+
+def build_scenarios(rng):
+    """Эндпоинты с весами. Горячие произведения выбираются чаще -
+    так же, как у них больше отзывов после benchmarks.seed."""
+    from django.db.models import F
+    from reviews.models import Review, Title
+
+    hot = list(Title.objects.order_by('-rating_count', 'id')
+               .values_list('id', flat=True)[:20])
+    titles = list(Title.objects.values_list('id', flat=True))
+    reviews = list(Review.objects.filter(title_id__in=hot).annotate(
+        owner=F('author_id')).values_list('id', 'title_id', 'owner'))
+    if not titles or not reviews:
+        raise SystemExit('Нет данных, сначала запустите benchmarks.seed')
+
+    def review():
+        return rng.choice(reviews)
+
+    reads = {
+        'titles-list': (3, lambda: ('get', '/api/v1/titles/', None)),
+        'titles-search': (1, lambda: (
+            'get', f'/api/v1/titles/?search={rng.randint(1, 999)}', None)),
+        'title-detail': (3, lambda: (
+            'get', f'/api/v1/titles/{rng.choice(titles)}/', None)),
+        'reviews-list': (3, lambda: (
+            'get', f'/api/v1/titles/{rng.choice(hot)}/reviews/', None)),
+        'review-detail': (2, lambda: (
+            'get', '/api/v1/titles/{1}/reviews/{0}/'.format(*review()),
+            None)),
+        'comments-list': (2, lambda: (
+            'get', '/api/v1/titles/{1}/reviews/{0}/comments/'.format(
+                *review()), None)),
+        'categories-list': (1, lambda: ('get', '/api/v1/categories/', None)),
+        'genres-list': (1, lambda: ('get', '/api/v1/genres/', None)),
+    }
+    writes = {
+        'comment-create': (3, lambda: (
+            'post', '/api/v1/titles/{1}/reviews/{0}/comments/'.format(
+                *review()), {'text': 'Комментарий бенчмарка'})),
+        'review-update': (1, lambda: (
+            'patch', '/api/v1/titles/{1}/reviews/{0}/'.format(*review()),
+            {'score': rng.randint(1, 10)})),
+    }
+    return reads, writes
+
+
+def pick(rng, scenarios):
+    names = list(scenarios)
+    weights = [scenarios[name][0] for name in names]
+    return rng.choices(names, weights)[0]
+
+
+def run(args):
+    from api.authentication import RoleAccessToken
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from reviews.models import User
+
+    rng = random.Random(args.seed)
+    reads, writes = build_scenarios(rng)
+    # правка отзыва разрешена модератору, так что все записи проходят
+    user = User.objects.filter(role='admin').order_by('id').first()
+    if user is None:
+        raise SystemExit('Нет администратора, сначала запустите '
+                         'benchmarks.seed')
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {RoleAccessToken.for_user(user)}')
+
+    latencies = {}
+    queries = {}
+    for number in range(args.warmup + args.requests):
+        is_write = rng.random() < args.write_ratio
+        scenarios = writes if is_write else reads
+        name = pick(rng, scenarios)
+        method, path, data = scenarios[name][1]()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data)
+            elapsed = time.perf_counter() - started
+        # captured_queries читает журнал соединения, поэтому считаем до
+        # его очистки; очистка не даёт журналу упереться в свой лимит
+        query_count = len(context.captured_queries)
+        reset_queries()
+        if response.status_code >= 400:
+            raise SystemExit(
+                f'{method.upper()} {path}: {response.status_code}')
+        if number < args.warmup:
+            continue
+        latencies.setdefault(name, []).append(elapsed)
+        queries.setdefault(name, []).append(query_count)
+
+    endpoints = {}
+    for name in sorted(latencies):
+        result = summarize(latencies[name])
+        result['queries_per_request'] = round(
+            sum(queries[name]) / len(queries[name]), 2)
+        endpoints[name] = result
+    return {
+        'meta': {
+            'vendor': connection.vendor,
+            'requests': args.requests,
+            'write_ratio': args.write_ratio,
+            'seed': args.seed,
+        },
+        'endpoints': endpoints,
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Регрессии относительно baseline: больше SQL на запрос или, если
+    задан допуск, p95 выше него. Эндпоинты, которых нет в baseline,
+    не сравниваются."""
+    problems = []
+    for name, current in result['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        if current['queries_per_request'] > previous['queries_per_request']:
+            problems.append(
+                f'{name}: SQL на запрос {previous["queries_per_request"]} '
+                f'-> {current["queries_per_request"]}')
+        if (tolerance is not None
+                and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance)):
+            problems.append(
+                f'{name}: p95 {previous["p95_ms"]} -> {current["p95_ms"]} мс')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Файл для результата в JSON')
+    parser.add_argument('--baseline', help='Результат для сравнения')
+    parser.add_argument(
+        '--tolerance', type=float,
+        help='Допустимый относительный рост p95, например 0.25; '
+             'без него задержки с baseline не сравниваются')
+    args = parser.parse_args()
+
+    setup_django()
+    result = run(args)
+    report = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report)
+    print(report)
+    if args.baseline:
+        with open(args.baseline) as file:
+            problems = compare(result, json.load(file), args.tolerance)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
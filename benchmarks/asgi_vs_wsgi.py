@@ -0,0 +1,72 @@
+"""Пропускная способность gunicorn с sync-воркерами и с ASGI-воркерами.
+
+Запускается из корня репозитория с теми же переменными окружения,
+что и приложение (SECRET_KEY, DB_HOST, DB_NAME и т. д.):
+
+    python -m benchmarks.asgi_vs_wsgi --workers 2 --clients 50 --duration 20
+
+Оба сервера запускаются с одинаковым числом воркеров, то есть примерно
+с одинаковой памятью; фактический RSS всех процессов тоже попадает в
+результат. Клиенты держат keep-alive соединения: sync-воркер занят таким
+клиентом целиком, ASGI-воркер держит соединения в цикле событий.
+"""
+import argparse
+import json
+import subprocess
+
+from .common import (http_load, process_tree_rss, project_dir, summarize,
+                     wait_for_port)
+
+SERVERS = {
+    'wsgi-sync': ['api_yamdb.wsgi:application'],
+    'asgi-uvicorn': [
+        'api_yamdb.asgi:application',
+        '--worker-class', 'uvicorn.workers.UvicornH11Worker',
+    ],
+}
+
+
+def run_server(name, args):
+    command = [
+        'gunicorn', *SERVERS[name],
+        '--bind', f'{args.host}:{args.port}',
+        '--workers', str(args.workers),
+        '--keep-alive', '30',
+    ]
+    server = subprocess.Popen(command, cwd=project_dir)
+    try:
+        wait_for_port(args.host, args.port, server)
+        # прогрев: импорт приложения и первые соединения к БД
+        http_load(args.host, args.port, args.path, 1, 1)
+        latencies, errors = http_load(
+            args.host, args.port, args.path, args.clients, args.duration)
+        result = summarize(latencies)
+        # summarize считает rps по сумме задержек одного потока,
+        # для параллельной нагрузки нужна стенная длительность
+        result['rps'] = round(len(latencies) / args.duration, 1)
+        result['errors'] = errors
+        result['rss_mb'] = process_tree_rss(server.pid)
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--path', default='/api/v1/titles/')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument(
+        '--servers', nargs='+', choices=SERVERS, default=list(SERVERS))
+    args = parser.parse_args()
+
+    results = {name: run_server(name, args) for name in args.servers}
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
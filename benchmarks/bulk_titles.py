@@ -0,0 +1,101 @@
+"""Пакетная запись произведений против цикла по одиночному эндпоинту.
+
+Запускается из корня репозитория на базе после benchmarks.seed:
+
+    python -m benchmarks.bulk_titles --titles 500
+
+Одни и те же произведения (с жанрами и категорией из базы) создаются
+сначала по одному через POST /api/v1/titles/, затем одним запросом
+POST /api/v1/titles/bulk/. Печатаются произведения в секунду, число
+SQL для обоих способов и ускорение. Созданные произведения удаляются.
+"""
+import argparse
+import json
+import time
+
+from .common import setup_django
+
+PREFIX = 'bulk-bench'
+
+
+def payload(count, label, genres, category):
+    return [
+        {
+            'name': f'{PREFIX} {label} {number}',
+            'year': 1950 + number % 70,
+            'description': 'Произведение бенчмарка',
+            'genre': genres,
+            'category': category,
+        }
+        for number in range(count)
+    ]
+
+
+def measure(client, requests):
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    queries = 0
+    started = time.perf_counter()
+    for path, data in requests:
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(path, data, format='json')
+        queries += len(context.captured_queries)
+        reset_queries()
+        if response.status_code >= 400:
+            raise SystemExit(f'POST {path}: {response.status_code}')
+    return time.perf_counter() - started, queries
+
+
+def run(args):
+    from api.authentication import RoleAccessToken
+    from rest_framework.test import APIClient
+    from reviews.models import Category, Genre, Title, User
+
+    user = User.objects.filter(role='admin').order_by('id').first()
+    category = Category.objects.order_by('id').first()
+    genres = list(Genre.objects.order_by('id')
+                  .values_list('slug', flat=True)[:args.genres])
+    if user is None or category is None or not genres:
+        raise SystemExit('Нет данных, сначала запустите benchmarks.seed')
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {RoleAccessToken.for_user(user)}')
+
+    Title.objects.filter(name__startswith=PREFIX).delete()
+    try:
+        single_time, single_queries = measure(client, [
+            ('/api/v1/titles/', item) for item in payload(
+                args.titles, 'single', genres, category.slug)])
+        bulk_time, bulk_queries = measure(client, [
+            ('/api/v1/titles/bulk/', payload(
+                args.titles, 'bulk', genres, category.slug))])
+    finally:
+        Title.objects.filter(name__startswith=PREFIX).delete()
+    return {
+        'titles': args.titles,
+        'single': {
+            'titles_per_second': round(args.titles / single_time, 1),
+            'queries': single_queries,
+        },
+        'bulk': {
+            'titles_per_second': round(args.titles / bulk_time, 1),
+            'queries': bulk_queries,
+        },
+        'speedup': round(single_time / bulk_time, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--titles', type=int, default=200)
+    parser.add_argument('--genres', type=int, default=3,
+                        help='Сколько жанров у каждого произведения')
+    args = parser.parse_args()
+
+    setup_django()
+    print(json.dumps(run(args), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import os
+import sys
+from os.path import abspath, dirname, join
+
+root_dir = dirname(dirname(abspath(__file__)))
+project_dir = join(root_dir, 'api_yamdb')
+
+
+def setup_django():
+    if project_dir not in sys.path:
+        sys.path.insert(0, project_dir)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    import django
+    django.setup()
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированной выборке, fraction от 0 до 1."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies):
+    """p50/p95/p99 в миллисекундах и число запросов в секунду."""
+    total = sum(latencies)
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'rps': round(len(latencies) / total, 1) if total else 0.0,
+    }
+
+
+def http_load(host, port, path, clients, duration, headers=None):
+    """Нагружает сервер из clients потоков, у каждого своё keep-alive
+    соединение. Возвращает задержки успешных запросов и число ошибок."""
+    import http.client
+    import threading
+    import time
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        local = []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers or {})
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                with lock:
+                    errors[0] += 1
+                continue
+            if response.status == 200:
+                local.append(time.perf_counter() - started)
+            else:
+                with lock:
+                    errors[0] += 1
+        connection.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def process_tree_rss(pid):
+    """Суммарный RSS процесса и его прямых потомков в мегабайтах (Linux)."""
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as file:
+            pids += [int(child) for child in file.read().split()]
+    except OSError:
+        pass
+    total = 0
+    for item in pids:
+        try:
+            with open(f'/proc/{item}/status') as file:
+                for line in file:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return round(total / 1024, 1)
+
+
+def wait_for_port(host, port, process=None, timeout=30):
+    import socket
+    import time
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(
+                f'Сервер завершился с кодом {process.returncode}')
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Сервер на {host}:{port} не запустился')
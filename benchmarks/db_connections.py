@@ -0,0 +1,96 @@
+"""Задержка запроса с постоянными соединениями к БД и без них.
+
+Запускается из корня репозитория с теми же переменными окружения,
+что и приложение (DB_HOST, DB_NAME и т. д.):
+
+    python -m benchmarks.db_connections --requests 500 \\
+        --path /api/v1/titles/ --pgbouncer pgbouncer:6432 \\
+        --output db_connections.json
+
+Для каждого значения CONN_MAX_AGE выполняется серия запросов через
+тестовый клиент Django. Тестовый клиент не закрывает соединения сам,
+поэтому после каждого запроса вызывается close_old_connections - так
+же, как это делает request_finished под gunicorn. С --pgbouncer та же
+серия повторяется через пул: постоянное соединение к pgbouncer, серверные
+курсоры выключены, как при DB_POOL_MODE=pgbouncer.
+"""
+import argparse
+import json
+import time
+
+from .common import setup_django, summarize
+
+
+def measure(client, path, requests, overrides):
+    from django.db import close_old_connections, connections
+
+    connections['default'].close()
+    connections['default'].settings_dict.update(overrides)
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(path)
+        close_old_connections()
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return summarize(latencies)
+
+
+def get_scenarios(args):
+    """(название, изменения settings_dict базы) для каждой серии."""
+    scenarios = [
+        (f'CONN_MAX_AGE={age}', {'CONN_MAX_AGE': age})
+        for age in args.conn_max_age
+    ]
+    if args.pgbouncer:
+        host, _, port = args.pgbouncer.partition(':')
+        scenarios.append((
+            f'pgbouncer, CONN_MAX_AGE={max(args.conn_max_age)}',
+            {
+                'CONN_MAX_AGE': max(args.conn_max_age),
+                'HOST': host,
+                'PORT': port or '6432',
+                'DISABLE_SERVER_SIDE_CURSORS': True,
+            }
+        ))
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--path', default='/api/v1/titles/')
+    parser.add_argument(
+        '--conn-max-age', type=int, nargs='+', default=[0, 60])
+    parser.add_argument(
+        '--pgbouncer', metavar='HOST[:PORT]',
+        help='Адрес pgbouncer для серии через пул')
+    parser.add_argument('--output', help='Файл для результата в JSON')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connections
+    from django.test import Client
+
+    client = Client()
+    client.get(args.path)
+    results = {
+        'meta': {
+            'vendor': connections['default'].vendor,
+            'path': args.path,
+            'requests': args.requests,
+        },
+        'scenarios': {
+            name: measure(client, args.path, args.requests, overrides)
+            for name, overrides in get_scenarios(args)
+        },
+    }
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Планы запросов для горячих фильтров и сортировок API.
+
+Запускается из корня репозитория на базе после benchmarks.seed:
+
+    python -m benchmarks.explain
+
+Для каждого запроса печатается план и проверяется, что он идёт по
+ожидаемому индексу. В PostgreSQL на время EXPLAIN отключается seqscan:
+на маленькой базе планировщик честно предпочитает полный просмотр,
+а проверить нужно, что индекс вообще применим.
+"""
+import sys
+
+from .common import setup_django
+
+
+def target_queries():
+    """(имя, queryset, фрагменты имён подходящих индексов, должна ли
+    сортировка идти по индексу)."""
+    from api.filters import StableOrderingFilter
+    from reviews.models import Comment, Genre, Review, Title
+
+    title = Title.objects.order_by('-rating_count', 'id').first()
+    review = Review.objects.filter(title=title).first()
+    genre = Genre.objects.first()
+    ordering = StableOrderingFilter()
+    return (
+        ('titles-by-year', Title.objects.filter(year=title.year),
+         ('title_year_id_idx',), True),
+        ('titles-by-category-year', Title.objects.filter(
+            category_id=title.category_id, year=title.year),
+         ('title_category_year_idx',), False),
+        # SQLite хранит уникальное ограничение как автоиндекс таблицы.
+        # Отобранные по жанру произведения сортируются отдельно
+        ('titles-by-genre', Title.objects.filter(genre__slug=genre.slug),
+         ('genre title unique', 'sqlite_autoindex_reviews_genretitle'),
+         False),
+        ('review-feed', Review.objects.filter(title=title),
+         ('review_title_pub_date_idx',), True),
+        ('comment-feed', Comment.objects.filter(review=review),
+         ('comment_review_pub_date_idx',), True),
+        ('titles-by-rating', ordering.order_queryset(
+            Title.objects.all(), ['-rating', '-id']),
+         ('title_rating_desc_idx', 'title_rating_id_idx'), True),
+        ('titles-by-year-order', ordering.order_queryset(
+            Title.objects.all(), ['year', 'id']),
+         ('title_year_id_idx',), True),
+        ('reviews-by-score', ordering.order_queryset(
+            Review.objects.filter(title=title), ['-score', '-id']),
+         ('review_title_score_idx',), True),
+    )
+
+
+def explain(queryset):
+    from django.db import connections, transaction
+
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    with transaction.atomic(using=queryset.db):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+def check_plan(plan, indexes, ordered=True):
+    """Проблемы плана: ни один из ожидаемых индексов не используется или
+    результат сортируется отдельно, а не читается из индекса по порядку."""
+    problems = []
+    if not any(index in plan for index in indexes):
+        problems.append(f'не используется индекс {indexes[0]}')
+    if ordered and ('TEMP B-TREE FOR ORDER BY' in plan
+                    or 'Sort Key' in plan):
+        problems.append('сортировка не по индексу')
+    return problems
+
+
+def main():
+    setup_django()
+    failed = False
+    for name, queryset, indexes, ordered in target_queries():
+        plan = explain(queryset)
+        problems = check_plan(plan, indexes, ordered)
+        failed = failed or bool(problems)
+        print(f'{name}: {"; ".join(problems) or "ok"}\n{plan}\n')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Кривая пропускной способности gunicorn для разных конфигураций.
+
+Запускается из корня репозитория с теми же переменными окружения,
+что и приложение (SECRET_KEY, DB_HOST, DB_NAME и т. д.):
+
+    python -m benchmarks.loadtest --clients 1 10 50 --duration 10 \\
+        --config sync:GUNICORN_WORKERS=2 \\
+        --config gthread:GUNICORN_WORKERS=2,GUNICORN_THREADS=4 \\
+        --output loadtest.json
+
+Каждая конфигурация - имя и переменные GUNICORN_* для gunicorn.conf.py.
+Для каждой gunicorn запускается заново и нагружается всеми уровнями
+параллельности по очереди; результат - rps, задержки и память процессов
+на каждом уровне.
+"""
+import argparse
+import json
+import os
+import subprocess
+
+from .common import (http_load, process_tree_rss, project_dir, summarize,
+                     wait_for_port)
+
+DEFAULT_CONFIGS = (
+    'sync:GUNICORN_WORKERS=2,GUNICORN_THREADS=1',
+    'gthread:GUNICORN_WORKERS=2,GUNICORN_THREADS=4',
+)
+
+
+def parse_config(value):
+    name, _, assignments = value.partition(':')
+    env = {}
+    for assignment in filter(None, assignments.split(',')):
+        key, _, env_value = assignment.partition('=')
+        if not key.startswith('GUNICORN_'):
+            raise argparse.ArgumentTypeError(
+                f'Ожидается переменная GUNICORN_*, получено {key}')
+        env[key] = env_value
+    return name, env
+
+
+def measure_config(name, env, args):
+    server = subprocess.Popen(
+        ['gunicorn', 'api_yamdb.wsgi:application',
+         '--config', 'gunicorn.conf.py'],
+        cwd=project_dir,
+        env={
+            **os.environ, **env,
+            'GUNICORN_BIND': f'{args.host}:{args.port}',
+        },
+    )
+    try:
+        wait_for_port(args.host, args.port, server)
+        http_load(args.host, args.port, args.path, 1, 1)
+        curve = []
+        for clients in args.clients:
+            latencies, errors = http_load(
+                args.host, args.port, args.path, clients, args.duration)
+            point = summarize(latencies)
+            point['rps'] = round(len(latencies) / args.duration, 1)
+            point.update(
+                clients=clients,
+                errors=errors,
+                rss_mb=process_tree_rss(server.pid),
+            )
+            curve.append(point)
+        return {'env': env, 'curve': curve}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--path', default='/api/v1/titles/')
+    parser.add_argument(
+        '--clients', type=int, nargs='+', default=[1, 5, 10, 25, 50])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument(
+        '--config', type=parse_config, action='append', dest='configs',
+        help='имя:GUNICORN_X=значение,... (можно указать несколько раз)')
+    parser.add_argument('--output', help='Файл для результата в JSON')
+    args = parser.parse_args()
+
+    configs = args.configs or [parse_config(item) for item in DEFAULT_CONFIGS]
+    results = {name: measure_config(name, env, args) for name, env in configs}
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report)
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
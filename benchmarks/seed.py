@@ -0,0 +1,148 @@
+"""Синтетические данные для бенчмарков API.
+
+Запускается из корня репозитория с теми же переменными окружения,
+что и приложение, после migrate:
+
+    python -m benchmarks.seed --users 1000 --titles 5000 --reviews 100000 \\
+        --comments 200000 --skew 1.1 --flush
+
+Число отзывов на произведение распределено по закону Ципфа с показателем
+--skew: у первых произведений тысячи отзывов, у хвоста - единицы, как в
+живом каталоге. Генератор детерминирован при одинаковом --seed.
+"""
+import argparse
+import random
+import time
+
+from .common import setup_django
+
+USER_PREFIX = 'bench'
+
+
+def review_counts(titles, reviews, users, skew):
+    """Сколько отзывов получит каждое произведение. Один автор пишет
+    не больше одного отзыва на произведение, поэтому не больше users."""
+    weights = [1 / (rank + 1) ** skew for rank in range(titles)]
+    total = sum(weights)
+    return [min(users, round(reviews * weight / total)) for weight in weights]
+
+
+def bulk_insert(model, objects, batch_size):
+    for start in range(0, len(objects), batch_size):
+        model.objects.bulk_create(objects[start:start + batch_size])
+
+
+def flush():
+    from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                                Title, User)
+
+    for model in (Comment, Review, GenreTitle, Title, Genre, Category):
+        model.objects.all()._raw_delete(model.objects.db)
+    User.objects.filter(username__startswith=USER_PREFIX).delete()
+
+
+def seed(args):
+    from django.core.cache import cache
+    from django.db import transaction
+    from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                                Title, User)
+
+    rng = random.Random(args.seed)
+    batch = args.batch_size
+    with transaction.atomic():
+        if args.flush:
+            flush()
+        bulk_insert(User, [
+            User(username=f'{USER_PREFIX}{number}',
+                 email=f'{USER_PREFIX}{number}@yamdb.fake',
+                 role='admin' if number == 0 else 'user')
+            for number in range(args.users)
+        ], batch)
+        user_ids = list(User.objects.filter(
+            username__startswith=USER_PREFIX).values_list('id', flat=True))
+
+        bulk_insert(Category, [
+            Category(name=f'Категория {number}', slug=f'category-{number}')
+            for number in range(args.categories)
+        ], batch)
+        category_ids = list(Category.objects.values_list('id', flat=True))
+        bulk_insert(Genre, [
+            Genre(name=f'Жанр {number}', slug=f'genre-{number}')
+            for number in range(args.genres)
+        ], batch)
+        genre_ids = list(Genre.objects.values_list('id', flat=True))
+
+        bulk_insert(Title, [
+            Title(name=f'Произведение {number}',
+                  year=rng.randint(1950, 2022),
+                  description=f'Описание {number}',
+                  category_id=rng.choice(category_ids))
+            for number in range(args.titles)
+        ], batch)
+        title_ids = list(
+            Title.objects.order_by('id').values_list('id', flat=True))
+        bulk_insert(GenreTitle, [
+            GenreTitle(title_id=title_id, genre_id=genre_id)
+            for title_id in title_ids
+            for genre_id in rng.sample(
+                genre_ids, min(len(genre_ids), rng.randint(1, 3)))
+        ], batch)
+
+        counts = review_counts(
+            len(title_ids), args.reviews, len(user_ids), args.skew)
+        bulk_insert(Review, [
+            Review(title_id=title_id, author_id=author_id,
+                   score=rng.randint(1, 10), text='Отзыв')
+            for title_id, count in zip(title_ids, counts)
+            for author_id in rng.sample(user_ids, count)
+        ], batch)
+        review_ids = list(Review.objects.values_list('id', flat=True))
+        if review_ids:
+            bulk_insert(Comment, [
+                Comment(review_id=rng.choice(review_ids),
+                        author_id=rng.choice(user_ids), text='Комментарий')
+                for _ in range(args.comments)
+            ], batch)
+
+        Title.objects.rebuild_ratings()
+        Review.objects.rebuild_comment_counts()
+    cache.clear()
+    return {
+        'users': len(user_ids),
+        'titles': len(title_ids),
+        'reviews': len(review_ids),
+        'max_reviews_per_title': max(counts, default=0),
+        'comments': args.comments if review_ids else 0,
+    }
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--genres', type=int, default=20)
+    parser.add_argument('--titles', type=int, default=1000)
+    parser.add_argument('--reviews', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument(
+        '--skew', type=float, default=1.1,
+        help='Показатель Ципфа для числа отзывов на произведение')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument(
+        '--flush', action='store_true',
+        help='Удалить каталог, отзывы и пользователей бенчмарка перед '
+             'загрузкой')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    args = parser.parse_args()
+    setup_django()
+    started = time.monotonic()
+    counts = seed(args)
+    print(f'{counts} за {time.monotonic() - started:.1f} с')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,39 @@
+import os
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+from django.core.cache import cache
+from django.db import connections
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
+if not os.getenv('DB_HOST'):
+    # PostgreSQL не настроен - тесты с базой данных идут на SQLite в памяти.
+    # Подменяется только набор подключений, сами настройки проекта
+    # (их проверяет test_settings) остаются прежними.
+    connections.__dict__['databases'] = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+    if hasattr(connections._connections, 'default'):
+        del connections._connections.default
+
 pytest_plugins = [
+    'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from api.authentication import local_auth_states
+    cache.clear()
+    local_auth_states.clear()
+    yield
+    cache.clear()
+    local_auth_states.clear()
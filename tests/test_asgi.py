@@ -0,0 +1,35 @@
+import asyncio
+
+from asgiref.testing import ApplicationCommunicator
+
+
+class TestAsgi:
+
+    def test_asgi_application_serves_requests(self):
+        from api_yamdb.asgi import application
+
+        async def request():
+            communicator = ApplicationCommunicator(application, {
+                'type': 'http',
+                'http_version': '1.1',
+                'method': 'GET',
+                'path': '/redoc/',
+                'raw_path': b'/redoc/',
+                'root_path': '',
+                'scheme': 'http',
+                'query_string': b'',
+                'headers': [(b'host', b'testserver')],
+                'client': ('127.0.0.1', 50000),
+                'server': ('testserver', 80),
+            })
+            await communicator.send_input(
+                {'type': 'http.request', 'body': b''})
+            start = await communicator.receive_output(timeout=5)
+            await communicator.receive_output(timeout=5)
+            return start
+
+        start = asyncio.run(request())
+        assert start['type'] == 'http.response.start'
+        assert start['status'] == 200, (
+            'Проверьте, что api_yamdb.asgi:application обслуживает запросы'
+        )
@@ -0,0 +1,43 @@
+import argparse
+
+import pytest
+from benchmarks.api import compare
+from benchmarks.seed import add_arguments, review_counts, seed
+from reviews.models import Review, Title
+
+
+def result(queries, p95):
+    return {'endpoints': {
+        'titles-list': {'queries_per_request': queries, 'p95_ms': p95}}}
+
+
+class TestBenchmarks:
+
+    def test_review_counts_are_skewed_and_capped(self):
+        counts = review_counts(titles=100, reviews=5000, users=300, skew=1.1)
+        assert counts == sorted(counts, reverse=True)
+        assert counts[0] == 300, (
+            'Проверьте, что отзывов на произведение не больше, '
+            'чем пользователей'
+        )
+        assert counts[0] > 10 * counts[-1]
+
+    def test_compare_reports_query_regressions(self):
+        assert compare(result(3, 10), result(2, 10), None) == [
+            'titles-list: SQL на запрос 2 -> 3']
+        assert compare(result(2, 50), result(2, 10), None) == [], (
+            'Проверьте, что без допуска задержки не сравниваются'
+        )
+        assert compare(result(2, 50), result(2, 10), 0.25)
+
+    @pytest.mark.django_db
+    def test_seed_keeps_counters_consistent(self):
+        parser = argparse.ArgumentParser()
+        add_arguments(parser)
+        args = parser.parse_args([
+            '--users', '5', '--titles', '10', '--reviews', '30',
+            '--comments', '20'])
+        counts = seed(args)
+        assert counts['titles'] == Title.objects.count() == 10
+        assert not Title.objects.rating_mismatches().exists()
+        assert not Review.objects.comment_count_mismatches().exists()
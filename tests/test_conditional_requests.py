@@ -0,0 +1,73 @@
+import pytest
+from reviews.models import Review
+
+
+# версии кеша сдвигаются только после фиксации транзакции
+@pytest.mark.django_db(transaction=True)
+class TestConditionalRequests:
+
+    def test_review_feed_not_modified(self, guest_client, review,
+                                      another_user,
+                                      django_assert_num_queries):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        response = guest_client.get(url)
+        etag = response['ETag']
+        assert etag, 'Проверьте, что список отзывов отдаёт ETag'
+        assert not response.has_header('Last-Modified'), (
+            'Проверьте, что Last-Modified с точностью до секунды не отдаётся'
+        )
+        with django_assert_num_queries(0):
+            response = guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что неизменённая лента отвечает 304 без запросов к БД'
+        )
+        Review.objects.create(
+            title=review.title, author=another_user, text='Новый', score=3)
+        response = guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_comment_feed_ignores_if_modified_since(self, guest_client,
+                                                    comment, user):
+        url = (f'/api/v1/titles/{comment.review.title_id}/reviews/'
+               f'{comment.review_id}/comments/')
+        etag = guest_client.get(url)['ETag']
+        response = guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        assert response.status_code == 200, (
+            'Проверьте, что If-Modified-Since не даёт ложный 304'
+        )
+        assert guest_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        comment.delete()
+        response = guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['count'] == 0
+
+    def test_username_change_refreshes_feeds(self, guest_client, comment,
+                                             user):
+        review = comment.review
+        reviews_url = f'/api/v1/titles/{review.title_id}/reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        etags = [guest_client.get(url)['ETag']
+                 for url in (reviews_url, comments_url)]
+        user.username = 'renamed'
+        user.save()
+        for url, etag in zip((reviews_url, comments_url), etags):
+            response = guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200, (
+                'Проверьте, что смена username сбрасывает ленты, '
+                'где он показан'
+            )
+            assert response.json()['results'][0]['author'] == 'renamed'
+
+    def test_title_detail_etag(self, guest_client, title):
+        url = f'/api/v1/titles/{title.id}/'
+        etag = guest_client.get(url)['ETag']
+        assert guest_client.get(
+            url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        title.name = 'Новое название'
+        title.save()
+        response = guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['name'] == 'Новое название'
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from api.models import OutgoingEmail
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class CheckingBackend(BaseEmailBackend):
+    """Запоминает, в каком состоянии была очередь во время отправки."""
+    seen = []
+
+    def send_messages(self, email_messages):
+        self.seen.append((
+            connection.in_atomic_block,
+            list(OutgoingEmail.objects.values_list('status', flat=True)),
+        ))
+        return len(email_messages)
+
+
+def create_email(**kwargs):
+    return OutgoingEmail.objects.create(
+        subject='Тема', body='Текст', from_email='admin@example.com',
+        to='user@yamdb.fake', **kwargs)
+
+
+def send_queued_emails():
+    call_command('send_queued_emails', stdout=StringIO())
+
+
+@pytest.mark.django_db
+class TestEmailQueue:
+
+    def test_signup_enqueues_email(self, guest_client):
+        response = guest_client.post(
+            '/api/v1/auth/signup/',
+            {'username': 'newcomer', 'email': 'newcomer@yamdb.fake'})
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что регистрация не отправляет письмо синхронно'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.to == 'newcomer@yamdb.fake'
+        send_queued_emails()
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.SENT
+        assert mail.outbox[0].to == ['newcomer@yamdb.fake']
+
+    def test_failed_delivery_is_retried(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_email_queue.FailingBackend'
+        settings.EMAIL_QUEUE_MAX_ATTEMPTS = 2
+        email = OutgoingEmail.objects.create(
+            subject='Тема', body='Текст', from_email='admin@example.com',
+            to='user@yamdb.fake')
+        send_queued_emails()
+        email.refresh_from_db()
+        assert (email.status, email.attempts) == (OutgoingEmail.PENDING, 1)
+        assert email.next_attempt_at > timezone.now(), (
+            'Проверьте, что повторная попытка откладывается'
+        )
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        send_queued_emails()
+        email.refresh_from_db()
+        assert (email.status, email.attempts) == (OutgoingEmail.FAILED, 2)
+        assert 'SMTP недоступен' in email.last_error
+
+
+@pytest.mark.django_db(transaction=True)
+class TestEmailQueueClaims:
+
+    def test_smtp_runs_outside_transaction(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_email_queue.CheckingBackend'
+        CheckingBackend.seen.clear()
+        email = create_email()
+        send_queued_emails()
+        assert CheckingBackend.seen == [(False, [OutgoingEmail.SENDING])], (
+            'Проверьте, что письмо сначала забирается короткой транзакцией, '
+            'а отправляется уже вне её'
+        )
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.SENT
+        assert email.claimed_at is not None
+
+    def test_abandoned_claim_is_retried(self, settings):
+        settings.EMAIL_QUEUE_CLAIM_TIMEOUT = 60
+        stale = timezone.now() - timedelta(minutes=5)
+        email = create_email(status=OutgoingEmail.SENDING, claimed_at=stale)
+        fresh = create_email(
+            status=OutgoingEmail.SENDING, claimed_at=timezone.now())
+        send_queued_emails()
+        email.refresh_from_db()
+        fresh.refresh_from_db()
+        assert (email.status, email.attempts) == (OutgoingEmail.PENDING, 1), (
+            'Проверьте, что письмо упавшего воркера возвращается в очередь'
+        )
+        assert fresh.status == OutgoingEmail.SENDING
+
+    def test_old_sent_emails_are_purged(self, settings):
+        settings.EMAIL_QUEUE_KEEP_SENT_DAYS = 7
+        old = create_email(
+            status=OutgoingEmail.SENT,
+            sent_at=timezone.now() - timedelta(days=8))
+        recent = create_email(
+            status=OutgoingEmail.SENT, sent_at=timezone.now())
+        failed = create_email(status=OutgoingEmail.FAILED)
+        send_queued_emails()
+        assert set(OutgoingEmail.objects.values_list('pk', flat=True)) == {
+            recent.pk, failed.pk}
+        assert not OutgoingEmail.objects.filter(pk=old.pk).exists()
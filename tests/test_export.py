@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+
+import pytest
+from api.export import iter_rows, stream_export
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Review, Title
+
+
+def read(response):
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_ndjson_reviews_with_related(self, admin_client, comment,
+                                         review, user):
+        response = admin_client.get(
+            '/api/v1/export/reviews/?output=ndjson&related=1')
+        assert response.status_code == 200
+        assert response.streaming, 'Проверьте, что выгрузка потоковая'
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = [json.loads(line) for line in read(response).splitlines()]
+        assert rows == [{
+            'id': review.id,
+            'title_id': review.title_id,
+            'author_id': user.id,
+            'text': 'Тестовый отзыв',
+            'score': 8,
+            'pub_date': rows[0]['pub_date'],
+            'comment_count': 1,
+            'author_username': user.username,
+        }]
+
+    def test_csv_titles(self, admin_client, title, review):
+        response = admin_client.get(
+            '/api/v1/export/titles/?output=csv&related=true')
+        assert response['Content-Disposition'] == (
+            'attachment; filename="titles.csv"')
+        rows = list(csv.DictReader(io.StringIO(read(response))))
+        assert rows == [{
+            'id': str(title.id), 'name': title.name, 'year': '1994',
+            'description': title.description,
+            'category_id': str(title.category_id),
+            'category_slug': 'movie', 'rating': '8', 'rating_count': '1',
+        }]
+
+    def test_same_datetime_format(self, admin_client, review):
+        ndjson = json.loads(read(admin_client.get('/api/v1/export/reviews/')))
+        rows = list(csv.DictReader(io.StringIO(read(
+            admin_client.get('/api/v1/export/reviews/?output=csv')))))
+        assert ndjson['pub_date'] == rows[0]['pub_date'], (
+            'Проверьте, что даты в NDJSON и CSV записаны одинаково'
+        )
+        assert ndjson['pub_date'] == review.pub_date.isoformat()
+
+    def test_without_related_columns(self, admin_client, comment):
+        response = admin_client.get('/api/v1/export/comments/')
+        row = json.loads(read(response))
+        assert 'author_username' not in row
+        assert set(row) == {'id', 'review_id', 'author_id', 'text',
+                            'pub_date'}
+
+    def test_related_columns_need_no_extra_queries(self, user, title):
+        Review.objects.bulk_create([
+            Review(title=Title.objects.create(
+                name=f'Произведение {number}', year=2000, description=''),
+                author=user, text='Отзыв', score=5)
+            for number in range(30)
+        ])
+        with CaptureQueriesContext(connection) as context:
+            lines = ''.join(stream_export(
+                'reviews', 'ndjson', related=True, chunk_size=7))
+        assert len(lines.splitlines()) == 30
+        assert len(context) == 1, (
+            'Проверьте, что связанные поля читаются тем же запросом'
+        )
+
+    def test_keyset_chunks_without_server_side_cursors(self, title,
+                                                       monkeypatch):
+        for number in range(4):
+            Title.objects.create(
+                name=f'Произведение {number}', year=2000, description='')
+        monkeypatch.setattr(connection, 'vendor', 'postgresql')
+        monkeypatch.setitem(
+            connection.settings_dict, 'DISABLE_SERVER_SIDE_CURSORS', True)
+        with CaptureQueriesContext(connection) as context:
+            rows = list(iter_rows(Title.objects.order_by('pk').values('id'),
+                                  chunk_size=2))
+        assert [row['id'] for row in rows] == sorted(
+            Title.objects.values_list('id', flat=True))
+        assert len(context) == 3
+
+    @pytest.mark.parametrize('url, status', [
+        ('/api/v1/export/users/', 404),
+        ('/api/v1/export/titles/?output=xml', 400),
+    ])
+    def test_bad_requests(self, admin_client, url, status):
+        assert admin_client.get(url).status_code == status
+
+    def test_only_admin(self, moderator_client):
+        response = moderator_client.get('/api/v1/export/titles/')
+        assert response.status_code == 403
+
+    def test_command(self, genres, tmp_path):
+        stdout = io.StringIO()
+        call_command('export_data', 'genres', '--format', 'csv',
+                     stdout=stdout)
+        assert stdout.getvalue().splitlines() == [
+            'id,name,slug',
+            f'{genres[0].id},Драма,drama',
+            f'{genres[1].id},Комедия,comedy',
+        ]
+        path = tmp_path / 'genres.ndjson'
+        call_command('export_data', 'genres', '--file', str(path))
+        assert len(path.read_text().splitlines()) == 2
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from reviews.management.commands.fill_the_base import Command
+from reviews.models import Comment, GenreTitle, Review, Title, User
+
+
+@pytest.mark.django_db
+class TestFillTheBase:
+
+    def load(self, **options):
+        call_command('fill_the_base', stdout=StringIO(), **options)
+        return (
+            User.objects.count(),
+            Title.objects.count(),
+            GenreTitle.objects.count(),
+            Review.objects.count(),
+            Comment.objects.count(),
+        )
+
+    def test_truncate_then_upsert(self):
+        assert self.load(batch_size=10) == (5, 32, 42, 72, 3), (
+            'Проверьте, что импорт загружает все строки из csv'
+        )
+        Title.objects.filter(pk=1).update(name='Изменено')
+        assert self.load(mode='upsert') == (5, 32, 42, 72, 3), (
+            'Проверьте, что повторный импорт не создаёт дублей'
+        )
+        assert Title.objects.get(pk=1).name == 'Побег из Шоушенка'
+        call_command('rebuild_ratings', check=True, stdout=StringIO())
+
+    def test_keeps_csv_dates(self):
+        self.load()
+        assert Comment.objects.get(pk=1).pub_date == datetime(
+            2020, 1, 13, 23, 20, 2, 422000, tzinfo=timezone.utc), (
+            'Проверьте, что дата публикации берётся из csv'
+        )
+        Comment.objects.filter(pk=1).update(pub_date=datetime.now(
+            timezone.utc))
+        self.load(mode='upsert')
+        assert Comment.objects.get(pk=1).pub_date.year == 2020
+
+    def test_import_keeps_date_default_for_other_saves(self, user,
+                                                       monkeypatch):
+        write_batch = Command.write_batch
+        saved = []
+
+        def write_batch_and_save(command, model, *args):
+            write_batch(command, model, *args)
+            if model is Comment:
+                # запись из другого потока сразу после пачки комментариев
+                saved.append(Comment.objects.create(
+                    review=Review.objects.first(), author=user,
+                    text='Комментарий'))
+
+        monkeypatch.setattr(Command, 'write_batch', write_batch_and_save)
+        self.load()
+        assert saved[0].pub_date is not None, (
+            'Проверьте, что загрузка не отключает дату по умолчанию '
+            'у других сохранений'
+        )
@@ -0,0 +1,61 @@
+import json
+import multiprocessing
+import os
+import runpy
+from types import SimpleNamespace
+
+from django.conf import settings
+
+config_path = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+
+
+def load_config(monkeypatch, **env):
+    for name in list(os.environ):
+        if name.startswith('GUNICORN_'):
+            monkeypatch.delenv(name)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(config_path)
+
+
+class TestGunicornConf:
+
+    def test_defaults(self, monkeypatch):
+        config = load_config(monkeypatch)
+        cpu_count = multiprocessing.cpu_count()
+        assert config['workers'] == 2 * cpu_count + 1
+        assert config['worker_class'] == 'sync'
+        assert config['preload_app'] is True, (
+            'Проверьте, что приложение загружается в мастере до fork'
+        )
+        assert config['max_requests'] > 0
+        assert config['max_requests_jitter'] > 0, (
+            'Проверьте, что перезапуск воркеров идёт с разбросом'
+        )
+
+    def test_threads_switch_to_gthread(self, monkeypatch):
+        config = load_config(monkeypatch, GUNICORN_THREADS='4')
+        assert config['worker_class'] == 'gthread'
+        assert config['workers'] == multiprocessing.cpu_count() + 1
+
+    def test_env_overrides(self, monkeypatch):
+        config = load_config(
+            monkeypatch,
+            GUNICORN_WORKERS='3',
+            GUNICORN_PRELOAD='false',
+            GUNICORN_BIND='127.0.0.1:9000',
+        )
+        assert config['workers'] == 3
+        assert config['preload_app'] is False
+        assert config['bind'] == '127.0.0.1:9000'
+
+    def test_child_exit_retires_worker_metrics(self, monkeypatch, tmp_path):
+        config = load_config(monkeypatch, METRICS_DIR=str(tmp_path))
+        (tmp_path / '4242.json').write_text(json.dumps(
+            {'yamdb_cache_requests_total': {'["response", "hit"]': 2}}))
+        config['child_exit'](None, SimpleNamespace(pid=4242))
+        assert not (tmp_path / '4242.json').exists(), (
+            'Проверьте, что файл метрик завершившегося воркера удаляется'
+        )
+        assert json.loads((tmp_path / 'dead.json').read_text()) == {
+            'yamdb_cache_requests_total': {'["response", "hit"]': 2}}
@@ -0,0 +1,124 @@
+import json
+import re
+
+import pytest
+from api.metrics import mark_process_dead, registry
+from api.models import OutgoingEmail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def sample(text, line_start):
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_request_histograms(self, client, user_client, title):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        labels = 'view="ReviewViewSet",action="list"'
+        before = client.get('/metrics').content.decode()
+        user_client.get(url)
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        text = response.content.decode()
+        count = (f'yamdb_http_request_duration_seconds_count'
+                 f'{{{labels},status="200"}}')
+        assert sample(text, count) == sample(before, count) + 1, (
+            'Проверьте, что длительность запроса попадает в гистограмму '
+            'с метками вьюсета, действия и статуса'
+        )
+        assert re.search(
+            rf'yamdb_http_request_db_queries_bucket\{{{labels},le="\+Inf"\}}',
+            text
+        )
+
+    def test_streaming_response_measured_after_stream(self, client,
+                                                       admin_client, review):
+        queries = ('yamdb_http_request_db_queries_sum'
+                   '{view="ExportAPIView",action="get"}')
+        before = sample(client.get('/metrics').content.decode(), queries)
+        response = admin_client.get('/api/v1/export/reviews/')
+        assert sample(
+            client.get('/metrics').content.decode(), queries) == before
+        with CaptureQueriesContext(connection) as context:
+            b''.join(response.streaming_content)
+        assert len(context) == 1
+        assert sample(
+            client.get('/metrics').content.decode(), queries
+        ) >= before + 1, (
+            'Проверьте, что SQL во время отдачи потока попадают в метрики'
+        )
+
+    def test_cache_and_email_queue(self, client, guest_client):
+        OutgoingEmail.objects.create(
+            subject='s', body='b', from_email='f@yamdb.fake',
+            to='t@yamdb.fake')
+        guest_client.get('/api/v1/categories/')
+        guest_client.get('/api/v1/categories/')
+        text = client.get('/metrics').content.decode()
+        assert sample(
+            text, 'yamdb_cache_requests_total{cache="response",result="hit"}'
+        ) >= 1
+        assert sample(
+            text, 'yamdb_email_queue_depth{status="pending"}') == 1
+
+    def test_workers_aggregated_through_directory(self, settings, tmp_path,
+                                                  client):
+        settings.METRICS_DIR = str(tmp_path)
+        name = 'yamdb_cache_requests_total'
+        other_worker = {name: {
+            registry.label_key(name, {'cache': 'response',
+                                      'result': 'miss'}): 5}}
+        (tmp_path / '1.json').write_text(json.dumps(other_worker))
+        own = registry.snapshot()[name].get(
+            registry.label_key(name, {'cache': 'response', 'result': 'miss'}),
+            0)
+        text = client.get('/metrics').content.decode()
+        assert sample(
+            text, f'{name}{{cache="response",result="miss"}}') == own + 5, (
+            'Проверьте, что /metrics суммирует файлы всех воркеров'
+        )
+
+    def test_dead_workers_keep_counters(self, settings, tmp_path, client):
+        settings.METRICS_DIR = str(tmp_path)
+        name = 'yamdb_cache_requests_total'
+        key = registry.label_key(name, {'cache': 'response', 'result': 'miss'})
+        line = f'{name}{{cache="response",result="miss"}}'
+        for pid, misses in ((1, 5), (2, 3)):
+            (tmp_path / f'{pid}.json').write_text(
+                json.dumps({name: {key: misses}}))
+        before = sample(client.get('/metrics').content.decode(), line)
+        mark_process_dead(str(tmp_path), 1)
+        mark_process_dead(str(tmp_path), 2)
+        assert not (tmp_path / '1.json').exists()
+        assert not (tmp_path / '2.json').exists()
+        after = sample(client.get('/metrics').content.decode(), line)
+        assert after == before, (
+            'Проверьте, что счётчики завершившихся воркеров не пропадают '
+            'из /metrics'
+        )
+        dead = json.loads((tmp_path / 'dead.json').read_text())
+        assert dead[name][key] == 8
+
+    def test_token_required(self, settings, client):
+        settings.METRICS_TOKEN = 'secret'
+        response = client.get('/metrics')
+        assert response.status_code == 401, (
+            'Проверьте, что /metrics без токена недоступен'
+        )
+        assert client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code == 401
+        assert client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer секрет'
+        ).status_code == 401, (
+            'Проверьте, что токен не из ASCII отклоняется, а не ломает /metrics'
+        )
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200
@@ -0,0 +1,133 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from reviews.models import Comment, Review, Title
+
+URL = '/api/v1/moderation/'
+
+
+@pytest.fixture
+def spam(title, user, another_user, admin, review):
+    """Отзывы another_user на несколько произведений с комментариями."""
+    reviews = [Review.objects.create(
+        title=title, author=another_user, text='Спам', score=1)]
+    for number in range(4):
+        other = Title.objects.create(
+            name=f'Произведение {number}', year=2000, description='')
+        Review.objects.create(title=other, author=user, text='Ок', score=9)
+        reviews.append(Review.objects.create(
+            title=other, author=another_user, text='Спам', score=1))
+    for item in reviews:
+        Comment.objects.create(review=item, author=user, text='Ответ')
+        Comment.objects.create(review=review, author=another_user,
+                               text='Спам')
+    return reviews
+
+
+def assert_counters_consistent():
+    assert not Title.objects.rating_mismatches().exists(), (
+        'Проверьте, что рейтинги произведений пересчитаны'
+    )
+    assert not Review.objects.comment_count_mismatches().exists(), (
+        'Проверьте, что счётчики комментариев пересчитаны'
+    )
+
+
+@pytest.mark.django_db
+class TestModeration:
+
+    @override_settings(MODERATION_BATCH_SIZE=2)
+    def test_delete_reviews_by_author(self, moderator_client, spam,
+                                      another_user, title):
+        response = moderator_client.post(URL, {
+            'target': 'reviews', 'action': 'delete',
+            'author': another_user.username,
+        }, format='json')
+        assert response.status_code == 200, response.json()
+        assert response.json() == {
+            'target': 'reviews', 'action': 'delete', 'count': 5,
+            'batches': 3, 'titles': 5, 'comments_deleted': 5,
+        }
+        assert not Review.objects.filter(author=another_user).exists()
+        title.refresh_from_db()
+        assert (title.rating, title.rating_count) == (8, 1)
+        assert_counters_consistent()
+
+    def test_delete_comments_updates_counts(self, moderator_client, spam,
+                                            review, another_user):
+        response = moderator_client.post(URL, {
+            'target': 'comments', 'action': 'delete',
+            'author': another_user.username, 'review': review.id,
+        }, format='json')
+        assert response.status_code == 200, response.json()
+        assert response.json()['count'] == 5
+        assert response.json()['reviews'] == 1
+        review.refresh_from_db()
+        assert review.comment_count == 0
+        assert_counters_consistent()
+
+    def test_update_scores_by_ids(self, admin_client, spam, title):
+        response = admin_client.post(URL, {
+            'target': 'reviews', 'action': 'update',
+            'ids': [spam[0].id], 'score': 10, 'text': 'Отредактировано',
+        }, format='json')
+        assert response.status_code == 200, response.json()
+        spam[0].refresh_from_db()
+        assert (spam[0].score, spam[0].text) == (10, 'Отредактировано')
+        title.refresh_from_db()
+        assert title.rating == 9
+        assert_counters_consistent()
+
+    def test_date_range_and_title(self, moderator_client, spam, title):
+        review = spam[0]
+        response = moderator_client.post(URL, {
+            'target': 'reviews', 'action': 'delete', 'title': title.id,
+            'pub_date_after': review.pub_date.isoformat(),
+            'pub_date_before': review.pub_date.isoformat(),
+        }, format='json')
+        assert response.json()['count'] == 1
+        assert not Review.objects.filter(pk=review.pk).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalidates_cached_title(self, moderator_client, spam, title,
+                                      another_user):
+        detail = f'/api/v1/titles/{title.id}/'
+        assert moderator_client.get(detail).json()['rating'] == 5
+        moderator_client.post(URL, {
+            'target': 'reviews', 'action': 'delete',
+            'author': another_user.username,
+        }, format='json')
+        assert moderator_client.get(detail).json()['rating'] == 8, (
+            'Проверьте, что модерация сбрасывает кеш произведения'
+        )
+
+    @pytest.mark.parametrize('payload', [
+        {'target': 'reviews', 'action': 'delete'},
+        {'target': 'reviews', 'action': 'delete', 'title': 1, 'review': 1},
+        {'target': 'comments', 'action': 'update', 'title': 1, 'score': 5},
+        {'target': 'reviews', 'action': 'update', 'title': 1},
+        {'target': 'reviews', 'action': 'delete', 'title': 1, 'text': 'x'},
+        {'target': 'reviews', 'action': 'delete', 'author': 'nobody'},
+    ])
+    def test_rejects_invalid_requests(self, moderator_client, payload):
+        response = moderator_client.post(URL, payload, format='json')
+        assert response.status_code == 400
+
+    def test_queries_do_not_grow_with_rows(self, moderator_client, spam,
+                                           another_user, user):
+        payload = {'target': 'reviews', 'action': 'delete'}
+        with CaptureQueriesContext(connection) as small:
+            moderator_client.post(
+                URL, {**payload, 'ids': [spam[0].id]}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            moderator_client.post(
+                URL, {**payload, 'author': another_user.username},
+                format='json')
+        assert len(large) == len(small) + 1, (
+            'Проверьте, что пачка удаляется постоянным числом запросов'
+        )
+
+    def test_only_moderators(self, user_client, guest_client):
+        payload = {'target': 'reviews', 'action': 'delete', 'title': 1}
+        assert user_client.post(URL, payload).status_code == 403
+        assert guest_client.post(URL, payload).status_code == 401
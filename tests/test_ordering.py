@@ -0,0 +1,82 @@
+import warnings
+
+import pytest
+from django.core.paginator import UnorderedObjectListWarning
+from reviews.models import Review, Title
+
+
+@pytest.fixture
+def titles(category):
+    created = [
+        Title.objects.create(
+            name=f'Произведение {number}', year=2000 + number % 2,
+            category=category, description='')
+        for number in range(4)
+    ]
+    Title.objects.filter(pk=created[0].pk).update(rating=5)
+    Title.objects.filter(pk__in=[created[1].pk, created[2].pk]).update(
+        rating=9)
+    return created
+
+
+def title_ids(client, query):
+    response = client.get(f'/api/v1/titles/?{query}')
+    assert response.status_code == 200
+    return [item['id'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestOrdering:
+
+    def test_default_orderings_are_stable(self, guest_client, titles,
+                                          review):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            response = guest_client.get('/api/v1/titles/')
+            assert response.status_code == 200
+            response = guest_client.get(
+                f'/api/v1/titles/{review.title_id}/reviews/')
+            assert response.status_code == 200
+        assert Review._meta.ordering == ('-pub_date', '-id')
+
+    def test_titles_by_rating(self, guest_client, titles):
+        ids = []
+        for page in (1, 2):
+            ids += title_ids(guest_client, f'ordering=-rating&page={page}')
+        assert ids[:3] == [titles[2].id, titles[1].id, titles[0].id], (
+            'Проверьте, что при равном рейтинге порядок задаёт id'
+        )
+        assert ids[3] == titles[3].id, (
+            'Проверьте, что произведения без рейтинга идут последними'
+        )
+
+    def test_titles_by_year(self, guest_client, titles):
+        ids = []
+        for page in (1, 2):
+            ids += title_ids(guest_client, f'ordering=year&page={page}')
+        assert ids == [titles[0].id, titles[2].id,
+                       titles[1].id, titles[3].id]
+
+    def test_unknown_field_ignored(self, guest_client, titles):
+        assert title_ids(guest_client, 'ordering=description') == [
+            titles[0].id, titles[1].id]
+
+    def test_reviews_by_score(self, guest_client, title, user, another_user):
+        low = Review.objects.create(
+            title=title, author=user, text='Плохо', score=2)
+        high = Review.objects.create(
+            title=title, author=another_user, text='Хорошо', score=9)
+        response = guest_client.get(
+            f'/api/v1/titles/{title.id}/reviews/?ordering=score')
+        assert [item['id'] for item in response.json()['results']] == [
+            low.id, high.id]
+
+    def test_cursor_rejects_nullable_ordering(self, guest_client, titles):
+        response = guest_client.get(
+            '/api/v1/titles/?pagination=cursor&ordering=-rating')
+        assert response.status_code == 400
+        response = guest_client.get(
+            '/api/v1/titles/?pagination=cursor&ordering=year')
+        assert response.status_code == 200
+        assert [item['id'] for item in response.json()['results']] == [
+            titles[0].id, titles[2].id]
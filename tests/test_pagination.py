@@ -0,0 +1,98 @@
+import pytest
+from api.paginations import ReviewCursorPagination
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Review
+
+
+@pytest.fixture
+def reviews(title, django_user_model):
+    return [
+        Review.objects.create(
+            title=title,
+            author=django_user_model.objects.create_user(
+                username=f'reviewer{index}',
+                email=f'reviewer{index}@yamdb.fake'),
+            text=f'Отзыв {index}',
+            score=index % 10 + 1)
+        for index in range(10)
+    ]
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    def test_review_feed_walk(self, guest_client, title, reviews):
+        url = (f'/api/v1/titles/{title.id}/reviews/'
+               '?pagination=cursor&page_size=4')
+        seen = []
+        with CaptureQueriesContext(connection) as context:
+            while url:
+                response = guest_client.get(url)
+                assert response.status_code == 200
+                data = response.json()
+                assert 'count' not in data, (
+                    'Проверьте, что курсорная пагинация не считает COUNT(*)'
+                )
+                seen.extend(review['id'] for review in data['results'])
+                url = data['next']
+        assert seen == [review.id for review in reversed(reviews)], (
+            'Проверьте, что лента отзывов идёт от новых к старым без повторов'
+        )
+        assert not any(
+            'COUNT(' in query['sql'] or 'OFFSET' in query['sql']
+            for query in context.captured_queries
+        )
+
+    def test_page_size_is_capped(self, guest_client, title, reviews,
+                                 monkeypatch):
+        monkeypatch.setattr(ReviewCursorPagination, 'max_page_size', 5)
+        response = guest_client.get(
+            f'/api/v1/titles/{title.id}/reviews/'
+            '?pagination=cursor&page_size=50')
+        assert len(response.json()['results']) == 5
+
+    def test_page_number_is_default(self, guest_client, title, reviews):
+        response = guest_client.get(f'/api/v1/titles/{title.id}/reviews/')
+        data = response.json()
+        assert data['count'] == 10
+        assert len(data['results']) == 3
+
+
+@pytest.mark.django_db
+class TestCachedCountPagination:
+
+    def count_queries(self, context):
+        return [
+            query['sql'] for query in context.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+
+    def test_review_count_from_counter(self, guest_client, title, reviews):
+        with CaptureQueriesContext(connection) as context:
+            response = guest_client.get(f'/api/v1/titles/{title.id}/reviews/')
+        data = response.json()
+        assert data['count'] == 10
+        assert data['count_exact'] is True
+        assert not self.count_queries(context), (
+            'Проверьте, что число отзывов берётся из счётчика произведения'
+        )
+
+    def test_comment_count_from_counter(self, guest_client, comment):
+        url = (f'/api/v1/titles/{comment.review.title_id}/reviews/'
+               f'{comment.review_id}/comments/')
+        with CaptureQueriesContext(connection) as context:
+            response = guest_client.get(url)
+        data = response.json()
+        assert (data['count'], data['count_exact']) == (1, True)
+        assert not self.count_queries(context)
+
+    def test_title_count_is_cached(self, guest_client, title):
+        first = guest_client.get('/api/v1/titles/').json()
+        assert (first['count'], first['count_exact']) == (1, True)
+        with CaptureQueriesContext(connection) as context:
+            second = guest_client.get('/api/v1/titles/').json()
+        assert (second['count'], second['count_exact']) == (1, False), (
+            'Проверьте, что повторный ответ берёт count из кеша'
+        )
+        assert not self.count_queries(context)
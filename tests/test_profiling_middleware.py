@@ -0,0 +1,86 @@
+import json
+import logging
+import time
+
+import pytest
+from api.serializers import ReviewSerializer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from tests.fixtures.fixture_user import get_client
+
+
+def server_timing(response):
+    metrics = {}
+    for item in response['Server-Timing'].split(', '):
+        name, *params = item.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+@pytest.mark.django_db
+class TestRequestProfiling:
+
+    def test_disabled_by_default(self, user_client, title):
+        response = user_client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.status_code == 200
+        assert not response.has_header('Server-Timing'), (
+            'Проверьте, что без сэмплирования запросы не профилируются'
+        )
+
+    def test_server_timing_header(self, settings, user, title, review,
+                                  caplog, monkeypatch):
+        settings.REQUEST_PROFILING_SAMPLE_RATE = 1
+        to_representation = ReviewSerializer.to_representation
+
+        def slow_to_representation(self, instance):
+            time.sleep(0.005)
+            return to_representation(self, instance)
+
+        # сериализация единственного отзыва займёт не меньше 5 мс
+        monkeypatch.setattr(
+            ReviewSerializer, 'to_representation', slow_to_representation)
+        client = get_client(user)
+        with caplog.at_level(logging.INFO, logger='api.profiling'):
+            response = client.get(f'/api/v1/titles/{title.id}/reviews/')
+        assert response.status_code == 200
+        metrics = server_timing(response)
+        assert set(metrics) == {'db', 'view', 'serialize', 'render', 'total'}
+        assert metrics['db']['desc'] == '"3 queries"'
+        assert float(metrics['serialize']['dur']) >= 5, (
+            'Проверьте, что время сериализации замеряется отдельно'
+        )
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['queries'] == 3
+        assert record['serialize_ms'] >= 5
+        assert record['path'] == f'/api/v1/titles/{title.id}/reviews/'
+        assert 'duplicates' not in record
+
+    def test_slow_request_logs_duplicates(self, settings, admin, title,
+                                          caplog):
+        settings.REQUEST_PROFILING_SAMPLE_RATE = 1
+        settings.REQUEST_PROFILING_SLOW_MS = 0
+        client = get_client(admin)
+        with caplog.at_level(logging.INFO, logger='api.profiling'):
+            client.get('/api/v1/users/')
+        record = caplog.records[-1]
+        assert record.levelno == logging.WARNING, (
+            'Проверьте, что медленные запросы логируются как предупреждение'
+        )
+        assert 'duplicates' in json.loads(record.getMessage())
+
+    def test_streaming_response_logged_after_stream(self, settings, admin,
+                                                    review, caplog):
+        settings.REQUEST_PROFILING_SAMPLE_RATE = 1
+        client = get_client(admin)
+        with caplog.at_level(logging.INFO, logger='api.profiling'), \
+                CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/export/reviews/')
+            assert not caplog.records, (
+                'Проверьте, что потоковый ответ замеряется после отдачи'
+            )
+            b''.join(response.streaming_content)
+        assert not response.has_header('Server-Timing')
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['queries'] == len(context), (
+            'Проверьте, что учитываются запросы во время отдачи потока'
+        )
@@ -0,0 +1,140 @@
+import pytest
+from api.views import TitleViewSet
+from reviews.models import Comment, Genre, GenreTitle, Review, Title
+
+
+@pytest.fixture
+def many_titles(category, genres):
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {index}', year=2000, category=category,
+              description='Описание')
+        for index in range(100)
+    )
+    titles = Title.objects.all()
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genre)
+        for title in titles
+        for genre in Genre.objects.all()
+    )
+    return titles
+
+
+@pytest.mark.django_db
+class TestTitleQueryCount:
+
+    @pytest.mark.parametrize('page_size', (1, 10, 100))
+    @pytest.mark.parametrize('query', ('', '?genre=drama&category=movie'))
+    def test_title_list(self, guest_client, many_titles, monkeypatch,
+                        django_assert_num_queries, page_size, query):
+        monkeypatch.setattr(
+            TitleViewSet.pagination_class, 'page_size', page_size)
+        # count, страница произведений с категориями, жанры страницы
+        with django_assert_num_queries(3):
+            response = guest_client.get(f'/api/v1/titles/{query}')
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert len(results) == page_size
+        assert all(len(title['genre']) == 2 for title in results)
+        assert all(title['category']['slug'] == 'movie' for title in results)
+
+    def test_title_detail(self, guest_client, title,
+                          django_assert_num_queries):
+        with django_assert_num_queries(2):
+            response = guest_client.get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+
+
+@pytest.fixture
+def many_reviews(title, django_user_model):
+    django_user_model.objects.bulk_create(
+        django_user_model(username=f'author{index}',
+                          email=f'author{index}@yamdb.fake')
+        for index in range(30)
+    )
+    authors = django_user_model.objects.filter(username__startswith='author')
+    for author in authors:
+        review = Review.objects.create(
+            title=title, author=author, text='Отзыв', score=7)
+    for author in authors:
+        Comment.objects.create(review=review, author=author, text='Коммент')
+    return review
+
+
+@pytest.mark.django_db
+class TestReviewCommentQueryCount:
+
+    @pytest.mark.parametrize('page_size', (1, 10, 30))
+    def test_review_list(self, guest_client, many_reviews,
+                         django_assert_num_queries, page_size):
+        url = (f'/api/v1/titles/{many_reviews.title_id}/reviews/'
+               f'?pagination=cursor&page_size={page_size}')
+        # непустой странице не нужна отдельная проверка произведения
+        with django_assert_num_queries(1):
+            response = guest_client.get(url)
+        results = response.json()['results']
+        assert len(results) == page_size
+        assert all(review['author'] for review in results)
+
+    @pytest.mark.parametrize('page_size', (1, 10, 30))
+    def test_comment_list(self, guest_client, many_reviews,
+                          django_assert_num_queries, page_size):
+        url = (f'/api/v1/titles/{many_reviews.title_id}/reviews/'
+               f'{many_reviews.id}/comments/'
+               f'?pagination=cursor&page_size={page_size}')
+        with django_assert_num_queries(1):
+            response = guest_client.get(url)
+        results = response.json()['results']
+        assert len(results) == page_size
+        assert all(comment['author'] for comment in results)
+
+    def test_page_number_lists(self, guest_client, many_reviews,
+                               django_assert_num_queries):
+        base = f'/api/v1/titles/{many_reviews.title_id}/reviews/'
+        with django_assert_num_queries(2):
+            guest_client.get(base)
+        with django_assert_num_queries(2):
+            guest_client.get(f'{base}{many_reviews.id}/comments/')
+
+
+@pytest.mark.django_db
+class TestNestedRoutes:
+
+    def test_review_detail_single_query(self, guest_client, review,
+                                        django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = guest_client.get(
+                f'/api/v1/titles/{review.title_id}/reviews/{review.id}/')
+        assert response.status_code == 200
+
+    def test_comment_chain_is_verified(self, guest_client, user_client,
+                                       comment, category):
+        other = Title.objects.create(
+            name='Другое', year=2000, category=category, description='-')
+        base = f'/api/v1/titles/{other.id}/reviews/{comment.review_id}'
+        assert guest_client.get(f'{base}/comments/').status_code == 404, (
+            'Проверьте, что отзыв должен принадлежать произведению из адреса'
+        )
+        assert guest_client.get(
+            f'{base}/comments/{comment.id}/').status_code == 404
+        response = user_client.post(f'{base}/comments/', {'text': 'Чужой'})
+        assert response.status_code == 404
+
+    def test_empty_cursor_page_checks_parent(self, guest_client, title):
+        response = guest_client.get(
+            f'/api/v1/titles/{title.id}/reviews/?pagination=cursor')
+        assert response.status_code == 200
+        response = guest_client.get(
+            f'/api/v1/titles/{title.id + 1}/reviews/?pagination=cursor')
+        assert response.status_code == 404
+
+    def test_comment_create_queries(self, user_client, review,
+                                    django_assert_num_queries):
+        url = (f'/api/v1/titles/{review.title_id}/reviews/'
+               f'{review.id}/comments/')
+        # версия прав пользователя кешируется первым запросом
+        user_client.get(url)
+        # отзыв вместе с проверкой произведения, вставка, счётчик
+        # комментариев и автор для ответа
+        with django_assert_num_queries(4):
+            response = user_client.post(url, {'text': 'Комментарий'})
+        assert response.status_code == 201
@@ -0,0 +1,37 @@
+import argparse
+
+import pytest
+from benchmarks.explain import check_plan, explain, target_queries
+from benchmarks.seed import add_arguments, seed
+from django.db import IntegrityError, transaction
+from reviews.models import GenreTitle
+
+
+@pytest.fixture
+def seeded_db(db):
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    seed(parser.parse_args([
+        '--users', '20', '--titles', '200', '--reviews', '1000',
+        '--comments', '2000']))
+
+
+class TestQueryPlans:
+
+    @pytest.mark.parametrize('query', (
+        'titles-by-year', 'titles-by-category-year', 'titles-by-genre',
+        'review-feed', 'comment-feed', 'titles-by-rating',
+        'titles-by-year-order', 'reviews-by-score'))
+    def test_hot_queries_use_indexes(self, seeded_db, query):
+        queries = {name: target for name, *target in target_queries()}
+        queryset, indexes, ordered = queries[query]
+        plan = explain(queryset)
+        assert check_plan(plan, indexes, ordered) == [], (
+            f'Проверьте индексы для запроса {query}:\n{plan}'
+        )
+
+    @pytest.mark.django_db
+    def test_genre_title_links_are_unique(self, title):
+        link = GenreTitle.objects.filter(title=title).first()
+        with pytest.raises(IntegrityError), transaction.atomic():
+            GenreTitle.objects.create(genre_id=link.genre_id, title=title)
@@ -0,0 +1,68 @@
+import pytest
+from api.views import TitleViewSet
+from django.db import transaction
+from reviews.models import Category, Genre, Review, Title
+
+
+# версии кеша сдвигаются только после фиксации транзакции
+@pytest.mark.django_db(transaction=True)
+class TestResponseCache:
+
+    def test_categories_cached_until_write(self, guest_client, admin_client,
+                                           category,
+                                           django_assert_num_queries):
+        guest_client.get('/api/v1/categories/')
+        with django_assert_num_queries(0):
+            response = guest_client.get('/api/v1/categories/')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что повторный запрос категорий отдаётся из кеша'
+        )
+        admin_client.post(
+            '/api/v1/categories/', {'name': 'Книга', 'slug': 'book'})
+        assert guest_client.get('/api/v1/categories/').json()['count'] == 2, (
+            'Проверьте, что запись в категории инвалидирует кеш'
+        )
+        Category.objects.filter(slug='book').delete()
+        assert guest_client.get('/api/v1/categories/').json()['count'] == 1
+
+    def test_query_string_is_part_of_key(self, guest_client, genres):
+        guest_client.get('/api/v1/genres/')
+        response = guest_client.get('/api/v1/genres/?search=Драма')
+        assert response.json()['count'] == 1
+
+    def test_title_detail_invalidation(self, guest_client, title,
+                                       another_user,
+                                       django_assert_num_queries):
+        url = f'/api/v1/titles/{title.id}/'
+        assert guest_client.get(url).json()['rating'] is None
+        with django_assert_num_queries(0):
+            guest_client.get(url)
+        Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=6)
+        assert guest_client.get(url).json()['rating'] == 6, (
+            'Проверьте, что новый отзыв инвалидирует кеш произведения'
+        )
+        title.genre.remove(Genre.objects.get(slug='drama'))
+        assert len(guest_client.get(url).json()['genre']) == 1, (
+            'Проверьте, что смена жанров инвалидирует кеш произведения'
+        )
+        Genre.objects.filter(slug='comedy').update(name='Комедия!')
+        Genre.objects.get(slug='comedy').save()
+        assert guest_client.get(url).json()['genre'][0]['name'] == 'Комедия!'
+
+    def test_read_during_uncommitted_write_is_not_kept(
+            self, guest_client, title, monkeypatch):
+        url = f'/api/v1/titles/{title.id}/'
+        snapshot = Title.objects.get(pk=title.pk)
+        with transaction.atomic():
+            title.name = 'Зелёная миля'
+            title.save()
+            # параллельный запрос ещё видит строки до фиксации записи
+            monkeypatch.setattr(
+                TitleViewSet, 'get_object', lambda view: snapshot)
+            assert guest_client.get(url).json()['name'] == snapshot.name
+            monkeypatch.undo()
+        assert guest_client.get(url).json()['name'] == 'Зелёная миля', (
+            'Проверьте, что версии кеша сдвигаются после фиксации '
+            'транзакции, а не внутри неё'
+        )
@@ -0,0 +1,88 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from api.db import violates_constraint
+from api.serializers import ReviewSerializer
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Review
+
+from tests.fixtures.fixture_user import get_client
+
+
+@pytest.mark.django_db
+class TestReviewUniqueness:
+
+    def test_duplicate_review_rejected_without_precheck(self, user_client,
+                                                        review):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, {'text': 'Ещё', 'score': 5})
+        assert response.status_code == 400
+        assert response.json() == {
+            'non_field_errors': ['an author allowedto review once']
+        }
+        assert not any(
+            query['sql'].startswith('SELECT (1) AS "a"')
+            for query in context.captured_queries
+        ), 'Проверьте, что перед вставкой нет запроса exists()'
+        review.title.refresh_from_db()
+        assert review.title.rating_count == 1, (
+            'Проверьте, что отклонённый отзыв не меняет рейтинг'
+        )
+
+    def test_other_integrity_errors_are_not_hidden(self, title, user):
+        with pytest.raises(IntegrityError):
+            ReviewSerializer().create({
+                'title': title, 'author': user, 'text': None, 'score': 5})
+
+    def test_postgresql_constraint_name(self):
+        def error_from(constraint_name):
+            cause = Exception('duplicate key')
+            cause.diag = SimpleNamespace(constraint_name=constraint_name)
+            error = IntegrityError('duplicate key')
+            error.__cause__ = cause
+            return error
+
+        assert violates_constraint(
+            error_from('title author unique'), Review, 'title author unique')
+        assert not violates_constraint(
+            error_from('reviews_review_title_id_fk'), Review,
+            'title author unique')
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentReviews:
+
+    def test_parallel_creates_single_success(self, title, user):
+        if connection.vendor != 'postgresql':
+            pytest.skip('SQLite в памяти блокирует таблицу целиком '
+                        'и не годится для параллельной записи')
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        workers = 8
+        barrier = threading.Barrier(workers)
+        statuses = []
+
+        def create_review():
+            client = get_client(user)
+            barrier.wait()
+            try:
+                response = client.post(url, {'text': 'Отзыв', 'score': 9})
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=create_review)
+                   for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(statuses) == [201] + [400] * (workers - 1), (
+            'Проверьте, что из параллельных отзывов одного автора '
+            'сохраняется ровно один'
+        )
+        assert Review.objects.filter(title=title, author=user).count() == 1
+        title.refresh_from_db()
+        assert (title.rating_count, title.rating) == (1, 9)
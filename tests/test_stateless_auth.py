@@ -0,0 +1,158 @@
+import time
+
+import pytest
+from api.authentication import (RoleAccessToken, get_auth_state,
+                                local_auth_states)
+from api.cache import LocalTTLCache
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tests.fixtures.fixture_user import get_client
+
+
+def user_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'reviews_user' in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+class TestStatelessAuth:
+
+    def test_read_does_not_load_user(self, user_client, title):
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        user_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(url)
+        assert response.status_code == 200
+        assert not user_queries(context), (
+            'Проверьте, что аутентификация по токену не читает пользователя '
+            'из БД, когда версия прав уже закеширована'
+        )
+
+    def test_role_change_revokes_token(self, moderator, moderator_client,
+                                       review):
+        url = (f'/api/v1/titles/{review.title_id}/reviews/{review.id}/')
+        moderator.role = 'user'
+        moderator.save()
+        response = moderator_client.delete(url)
+        assert response.status_code == 401, (
+            'Проверьте, что после смены роли старый токен отклоняется'
+        )
+        response = get_client(moderator).delete(url)
+        assert response.status_code == 403, (
+            'Проверьте, что новый токен несёт актуальную роль'
+        )
+
+    def test_blocked_user_rejected(self, user, user_client):
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        response = user_client.get('/api/v1/users/me/')
+        assert response.status_code == 401, (
+            'Проверьте, что токен заблокированного пользователя отклоняется'
+        )
+
+    def test_users_me(self, user_client, user):
+        response = user_client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['username'] == user.username
+
+    def test_token_carries_only_role_version(self, admin):
+        token = RoleAccessToken.for_user(admin)
+        assert token['role_version'] == admin.role_version
+        for claim in ('role', 'is_superuser', 'username'):
+            assert claim not in token, (
+                'Проверьте, что роль и флаги берутся из состояния прав, '
+                'а не из claims токена'
+            )
+
+    def test_legacy_token_still_accepted(self, admin):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+        response = client.get('/api/v1/users/')
+        assert response.status_code == 200, (
+            'Проверьте, что токены без role_version продолжают работать'
+        )
+
+    def test_legacy_token_does_not_load_user(self, admin):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+        client.get('/api/v1/categories/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/categories/')
+        assert response.status_code == 200
+        assert not user_queries(context), (
+            'Проверьте, что состояние пользователя берётся из кеша'
+        )
+
+    def test_local_cache_counts_hits(self, user_client):
+        user_client.get('/api/v1/categories/')
+        before = local_auth_states.stats()
+        user_client.get('/api/v1/categories/')
+        after = local_auth_states.stats()
+        assert after['hits'] == before['hits'] + 1
+        assert after['misses'] == before['misses']
+
+    # кеш прав сбрасывается только после фиксации транзакции
+    @pytest.mark.django_db(transaction=True)
+    def test_admin_patch_downgrades_immediately(self, admin_client,
+                                                moderator, moderator_client,
+                                                review):
+        url = f'/api/v1/titles/{review.title_id}/reviews/{review.id}/'
+        moderator_client.get(url)
+        response = admin_client.patch(
+            f'/api/v1/users/{moderator.username}/', {'role': 'user'})
+        assert response.status_code == 200
+        response = moderator_client.delete(url)
+        assert response.status_code == 401, (
+            'Проверьте, что изменение пользователя сбрасывает кеш прав'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stale_read_does_not_outlive_change(self, moderator,
+                                                monkeypatch):
+        cache_set = cache.set
+
+        def set_after_concurrent_change(*args, **kwargs):
+            # запрос уже прочитал из БД старую роль, а другой запрос
+            # успел понизить её и сбросить кеш
+            monkeypatch.setattr(cache, 'set', cache_set)
+            moderator.role = 'user'
+            moderator.save()
+            cache_set(*args, **kwargs)
+
+        monkeypatch.setattr(cache, 'set', set_after_concurrent_change)
+        assert get_auth_state(moderator.id)['role'] == 'moderator'
+        local_auth_states.clear()
+        assert get_auth_state(moderator.id)['role'] == 'user', (
+            'Проверьте, что состояние, прочитанное до изменения, не '
+            'остаётся в общем кеше после его сброса'
+        )
+
+
+class TestLocalTTLCache:
+
+    def test_evicts_least_recently_used(self):
+        local = LocalTTLCache(maxsize=2, timeout=60)
+        local.set('a', 1)
+        local.set('b', 2)
+        local.get('a')
+        local.set('c', 3)
+        assert local.get('b') is None
+        assert local.get('a') == 1
+        assert local.stats()['size'] == 2
+
+    def test_entries_expire(self, monkeypatch):
+        local = LocalTTLCache(maxsize=10, timeout=5)
+        local.set('a', 1)
+        now = time.monotonic()
+        monkeypatch.setattr(time, 'monotonic', lambda: now + 6)
+        assert local.get('a') is None, (
+            'Проверьте, что запись устаревает по истечении таймаута'
+        )
@@ -0,0 +1,97 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import Review, Title
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def refresh(self, title):
+        title.refresh_from_db()
+        return title.rating_sum, title.rating_count, title.rating
+
+    def test_rating_follows_review_writes(self, title, user, another_user):
+        assert self.refresh(title) == (0, 0, None), (
+            'Проверьте, что у произведения без отзывов рейтинг пуст'
+        )
+        first = Review.objects.create(
+            title=title, author=user, text='Отзыв', score=10)
+        Review.objects.create(
+            title=title, author=another_user, text='Отзыв', score=5)
+        assert self.refresh(title) == (15, 2, 8), (
+            'Проверьте, что рейтинг обновляется при создании отзыва '
+            'и округляется до целого'
+        )
+        first = Review.objects.get(pk=first.pk)
+        first.score = 1
+        first.save()
+        assert self.refresh(title) == (6, 2, 3), (
+            'Проверьте, что рейтинг обновляется при изменении оценки'
+        )
+        first.delete()
+        assert self.refresh(title) == (5, 1, 5), (
+            'Проверьте, что рейтинг обновляется при удалении отзыва'
+        )
+
+    def test_rating_follows_cascade_delete(self, title, review, user):
+        user.delete()
+        assert self.refresh(title) == (0, 0, None), (
+            'Проверьте, что рейтинг обновляется при каскадном удалении'
+        )
+
+    def test_api_reads_stored_rating(self, guest_client, review):
+        with CaptureQueriesContext(connection) as context:
+            response = guest_client.get(f'/api/v1/titles/{review.title_id}/')
+        assert response.status_code == 200
+        assert not any(
+            'reviews_review' in query['sql']
+            for query in context.captured_queries
+        ), 'Проверьте, что рейтинг не агрегируется по отзывам при чтении'
+        assert response.json()['rating'] == 8, (
+            'Проверьте, что рейтинг берётся из сохранённого значения'
+        )
+
+    def test_rebuild_ratings_command(self, title, review):
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', check=True)
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', check=True)
+        assert self.refresh(title) == (8, 1, 8)
+
+    def test_stale_rating_column_is_detected(self, title, review):
+        Title.objects.update(rating=3)
+        assert list(Title.objects.rating_mismatches()) == [title], (
+            'Проверьте, что испорченный столбец rating считается '
+            'расхождением'
+        )
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', check=True)
+        call_command('rebuild_ratings')
+        assert self.refresh(title) == (8, 1, 8)
+
+    def test_rebuild_refreshes_cached_responses(self, user_client, title,
+                                                review):
+        url = f'/api/v1/titles/{title.id}/'
+        Title.objects.update(rating=3)
+        response = user_client.get(url)
+        assert response.json()['rating'] == 3
+        call_command('rebuild_ratings', stdout=StringIO())
+        assert user_client.get(url).json()['rating'] == 8, (
+            'Проверьте, что после пересчёта API отдаёт исправленный рейтинг'
+        )
+        assert user_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code == 200, (
+            'Проверьте, что пересчёт меняет ETag исправленных произведений'
+        )
+
+    def test_titles_without_reviews_match(self, title):
+        assert not Title.objects.rating_mismatches().exists()
+        Title.objects.update(rating=5)
+        assert Title.objects.rating_mismatches().exists()
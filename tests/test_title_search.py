@@ -0,0 +1,45 @@
+import pytest
+from reviews.models import Title
+
+
+@pytest.fixture
+def searchable_titles(category):
+    return [
+        Title.objects.create(
+            name=name, year=1990, category=category, description='Описание')
+        for name in ('The Godfather Part II', 'Godfather', 'Godfathers',
+                     'Pulp Fiction')
+    ]
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def test_search_orders_by_relevance(self, guest_client,
+                                        searchable_titles):
+        response = guest_client.get(
+            '/api/v1/titles/?search=godfather')
+        assert response.status_code == 200
+        names = [title['name'] for title in response.json()['results']]
+        assert names[0] == 'Godfather', (
+            'Проверьте, что точное совпадение названия идёт первым'
+        )
+        assert 'Pulp Fiction' not in names
+        assert response.json()['count'] == 3
+
+    def test_search_combines_with_filters(self, guest_client,
+                                          searchable_titles):
+        response = guest_client.get(
+            '/api/v1/titles/?search=godfather&name=Part')
+        names = [title['name'] for title in response.json()['results']]
+        assert names == ['The Godfather Part II']
+
+    def test_search_rejects_cursor_pagination(self, guest_client,
+                                              searchable_titles):
+        response = guest_client.get(
+            '/api/v1/titles/?search=godfather&pagination=cursor')
+        assert response.status_code == 400, (
+            'Проверьте, что поиск с курсорной пагинацией отклоняется, '
+            'а не теряет сортировку по релевантности'
+        )
+        assert 'search' in response.json()
@@ -0,0 +1,104 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from reviews.models import GenreTitle, Title
+
+URL = '/api/v1/titles/bulk/'
+
+
+def items(count, start=0):
+    return [
+        {
+            'name': f'Пакетное произведение {number}',
+            'year': 2000 + number,
+            'description': 'Из пакета',
+            'genre': ['drama', 'comedy'],
+            'category': 'movie',
+        }
+        for number in range(start, start + count)
+    ]
+
+
+@pytest.mark.django_db
+class TestTitlesBulk:
+
+    def test_bulk_create(self, admin_client, category, genres):
+        response = admin_client.post(URL, items(3), format='json')
+        assert response.status_code == 200, response.json()
+        data = response.json()
+        assert [item['name'] for item in data] == [
+            f'Пакетное произведение {number}' for number in range(3)]
+        assert data[0]['category']['slug'] == 'movie'
+        assert {genre['slug'] for genre in data[0]['genre']} == {
+            'drama', 'comedy'}
+        assert GenreTitle.objects.count() == 6
+
+    def test_query_count_does_not_grow(self, admin_client, category, genres):
+        admin_client.get('/api/v1/titles/')
+        with CaptureQueriesContext(connection) as small:
+            admin_client.post(URL, items(2), format='json')
+        with CaptureQueriesContext(connection) as large:
+            admin_client.post(URL, items(20, start=2), format='json')
+        assert len(large) == len(small), (
+            'Проверьте, что число запросов не зависит от размера пакета'
+        )
+
+    def test_per_item_errors(self, admin_client, category, genres, title):
+        payload = items(3)
+        payload[1]['genre'] = ['drama', 'horror']
+        payload[2]['name'] = title.name
+        response = admin_client.post(URL, payload, format='json')
+        assert response.status_code == 400
+        assert response.json() == [
+            {},
+            {'genre': ['Object with slug=horror does not exist.']},
+            {'name': ['title with this name already exists.']},
+        ]
+        assert Title.objects.count() == 1, (
+            'Проверьте, что при ошибках пакет не записывается'
+        )
+
+    def test_missing_fields_for_create(self, admin_client):
+        response = admin_client.post(URL, [{'name': 'Без года'}],
+                                     format='json')
+        assert response.status_code == 400
+        assert set(response.json()[0]) == {
+            'year', 'description', 'genre', 'category'}
+
+    def test_create_requires_genre_and_category(self, admin_client,
+                                                category, genres):
+        payload = items(2)
+        del payload[0]['genre']
+        payload[1]['category'] = None
+        response = admin_client.post(URL, payload, format='json')
+        assert response.status_code == 400
+        # ошибки те же, что у POST /api/v1/titles/ для таких же данных
+        single = [
+            admin_client.post('/api/v1/titles/', item, format='json')
+            for item in payload
+        ]
+        assert all(item.status_code == 400 for item in single)
+        assert response.json() == [item.json() for item in single], (
+            'Проверьте, что пакет создаёт произведения только с жанрами '
+            'и категорией, как POST /api/v1/titles/'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bulk_update(self, admin_client, title, genres):
+        detail = f'/api/v1/titles/{title.id}/'
+        admin_client.get(detail)
+        response = admin_client.post(URL, [
+            {'id': title.id, 'year': 1995, 'genre': ['comedy']},
+        ] + items(1), format='json')
+        assert response.status_code == 200, response.json()
+        title.refresh_from_db()
+        assert title.year == 1995
+        assert list(title.genre.values_list('slug', flat=True)) == [
+            'comedy']
+        assert admin_client.get(detail).json()['year'] == 1995, (
+            'Проверьте, что пакетная запись сбрасывает кеш произведения'
+        )
+
+    def test_only_admin(self, user_client, category, genres):
+        response = user_client.post(URL, items(1), format='json')
+        assert response.status_code == 403